@@ -0,0 +1,151 @@
+import logging
+import math
+import time
+from fastapi import HTTPException, Request, status
+from app.auth.service import verify_token
+from app.config import get_settings
+from app.metrics import Counter
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+rate_limited = Counter("chatr_rate_limited_total", "Auth requests rejected by the rate limiter", ("bucket",))
+
+
+class TokenBucketLimiter:
+    """ Token buckets held in this process, refilled lazily on each take """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets = {}  # key -> [tokens, updated]
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """ Spend one token; returns 0 if allowed, otherwise seconds until a token is free """
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now, rate, burst)
+            bucket = self._buckets[key] = [float(burst), now]
+
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+    def _prune(self, now: float, rate: float, burst: int) -> None:
+        """ Forget buckets that have refilled, or the oldest half if a flood keeps them all busy """
+        full = [key for key, (tokens, updated) in self._buckets.items() if tokens + (now - updated) * rate >= burst]
+        for key in full:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            for key in list(self._buckets)[:self.max_keys // 2]:
+                del self._buckets[key]
+
+    def reset(self) -> None:
+        self._buckets.clear()
+
+
+# refill and take in one round trip; replies are strings since Lua numbers come back truncated
+TOKEN_BUCKET_SCRIPT = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry = 0
+if tokens >= 1 then tokens = tokens - 1 else retry = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(retry)
+"""
+
+
+class RedisTokenBucketLimiter:
+    """ Token buckets in Redis, shared by every worker; fails open if Redis is unreachable """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        # optional dependency, only needed when the buckets are shared
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        try:
+            retry = await self._script(keys=[self.prefix + key], args=[rate, burst, time.time()])
+        except Exception as e:
+            # a broken limiter must not lock everyone out of their accounts
+            logger.warning(f"Rate limiter unavailable, allowing request: {str(e)}")
+            return 0.0
+        return float(retry)
+
+    def reset(self) -> None:
+        pass
+
+
+def build_limiter(settings):
+    if settings.rate_limit_redis_url:
+        return RedisTokenBucketLimiter(settings.rate_limit_redis_url)
+    return TokenBucketLimiter()
+
+
+auth_limiter = build_limiter(settings)
+
+
+async def _target_account(request: Request) -> tuple:
+    """ ("email", address) for a login or registration, ("refresh", subject) for a refresh, or None;
+    FastAPI has already parsed the body """
+    if request.method != "POST" or "json" not in request.headers.get("content-type", ""):
+        return None
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    if not isinstance(body, dict):
+        return None
+
+    email = body.get("email")
+    if isinstance(email, str) and email:
+        return "email", email.strip().lower()
+
+    refresh_token = body.get("refresh_token")
+    if isinstance(refresh_token, str):
+        # only a signed token names an account, so nobody can drain someone else's bucket; a
+        # forged one is turned away by this check alone, before the route reaches the database
+        try:
+            return "refresh", verify_token(refresh_token, "refresh")["sub"]
+        except HTTPException:
+            return None
+    return None
+
+
+async def auth_rate_limit(request: Request) -> None:
+    """ Dependency for the auth routes: reject floods before any bcrypt or database work """
+    if not settings.rate_limit_enabled:
+        return
+
+    buckets = []
+    if settings.rate_limit_per_ip:
+        # the proxy's own address unless uvicorn trusts its X-Forwarded-For (FORWARDED_ALLOW_IPS)
+        client_ip = request.client.host if request.client else "unknown"
+        buckets.append(("ip", f"ip:{client_ip}", settings.rate_limit_ip_per_minute, settings.rate_limit_ip_burst))
+    account = await _target_account(request)
+    if account:
+        bucket, target = account
+        buckets.append((bucket, f"{bucket}:{target}", settings.rate_limit_email_per_minute,
+                        settings.rate_limit_email_burst))
+
+    for bucket, key, per_minute, burst in buckets:
+        retry_after = await auth_limiter.take(key, per_minute / 60, burst)
+        if retry_after > 0:
+            rate_limited.inc((bucket,))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts. Try again later.",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
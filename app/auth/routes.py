@@ -1,33 +1,36 @@
-from fastapi import APIRouter, HTTPException,Depends, status,BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException,Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
+from sqlalchemy import select
 from app.users.models import User
 from app.users.schema import UserCreate,UserResponse,UserLogin
 from app.auth.schema import TokenResponse,RequestTokenResponse,EmailVerificationRequest,EmailVerificationResponse
-from app.auth.service import create_access_token,create_refresh_token,verify_token,validate_email_token,send_verification_email,create_verification_token
-from app.database.main import get_db_session
-from app.users.service import UserService
+from app.auth.service import access_token_claims,create_access_token,create_refresh_token,verify_token,validate_email_token,create_verification_token
+from app.database.main import get_async_db_session
+from app.users.service import AsyncUserService
+from app.auth.ratelimit import auth_rate_limit
 
 
-router = APIRouter()
+# every auth route is rate limited before its own dependencies run
+router = APIRouter(dependencies=[Depends(auth_rate_limit)])
 
 
 
 # User Routes
 @router.post("/register", response_model= TokenResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate,background_tasks : BackgroundTasks, db: Session = Depends(get_db_session)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db_session)):
 
     try:
-        user_service = UserService(db)
+        user_service = AsyncUserService(db)
         
         # Create user with validation
-        db_user = user_service.create_user(user_data)
+        db_user = await user_service.create_user(user_data)
 
-        verification_token = create_verification_token(db_user.id,db)
-        background_tasks.add_task(send_verification_email,db_user.email,verification_token.token,db_user.username)
+        # the outbox worker sends the verification email
+        await create_verification_token(db_user,db)
 
         # creates tokens
-        access_token = create_access_token(data={"sub": db_user.email})
+        access_token = create_access_token(data=access_token_claims(db_user))
         refresh_token = create_refresh_token(data={"sub":db_user.email})
 
         return {
@@ -41,14 +44,14 @@ async def register(user_data: UserCreate,background_tasks : BackgroundTasks, db:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail="Registration failed. Try again.")
 
 @router.post("/login",response_model=TokenResponse)
-async def login(user_data: UserLogin, db : Session = Depends(get_db_session)):
+async def login(user_data: UserLogin, db : AsyncSession = Depends(get_async_db_session)):
 
-    user_service = UserService(db)
-    user = user_service.authenticate_user(user_data)
+    user_service = AsyncUserService(db)
+    user = await user_service.authenticate_user(user_data)
     
     # create tokens for authenticated user
     if user is not None:
-        access_token = create_access_token(data={"sub": user.email})
+        access_token = create_access_token(data=access_token_claims(user))
         refresh_token = create_refresh_token(data={"sub":user.email})
 
     return{
@@ -58,18 +61,19 @@ async def login(user_data: UserLogin, db : Session = Depends(get_db_session)):
     }
 
 @router.post("/refresh",response_model=TokenResponse)
-async def get_refresh_token(refresh_data: RequestTokenResponse, db : Session = Depends(get_db_session)):
+async def get_refresh_token(refresh_data: RequestTokenResponse, db : AsyncSession = Depends(get_async_db_session)):
     try:
 
         # verify refresh token and get object of that user
         payload = verify_token(refresh_data.refresh_token,"refresh")
         email = payload.get('sub')
-        user = db.query(User).filter(User.email == email).first()
+        result = await db.execute(select(User).filter(User.email == email))
+        user = result.scalars().first()
 
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="User not found")
         
-        new_access_token = create_access_token(data={'sub':email})
+        new_access_token = create_access_token(data=access_token_claims(user))
         new_refresh_token = create_refresh_token(data={'sub':email})
 
         return {
@@ -82,10 +86,10 @@ async def get_refresh_token(refresh_data: RequestTokenResponse, db : Session = D
     
 
 @router.post('/verify-email',response_model=EmailVerificationResponse)
-async def verify_email(verification_data: EmailVerificationRequest, db: Session = Depends(get_db_session)):
+async def verify_email(verification_data: EmailVerificationRequest, db: AsyncSession = Depends(get_async_db_session)):
     
     try:
-        is_valid = validate_email_token(verification_data.token, db)
+        is_valid = await validate_email_token(verification_data.token, db)
 
         if is_valid:
             return EmailVerificationResponse(
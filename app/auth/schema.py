@@ -1,4 +1,4 @@
-from pydantic import BaseModel,EmailStr
+from pydantic import BaseModel,EmailStr,ConfigDict
 from app.users.schema import UserResponse
 
 class TokenResponse(BaseModel):
@@ -15,3 +15,23 @@ class EmailVerificationRequest(BaseModel):
 class EmailVerificationResponse(BaseModel):
     success: bool
     message: str
+
+class CurrentUser(BaseModel):
+    """lightweight snapshot of the authenticated user, safe to cache between requests"""
+    id: str
+    username: str
+    email: str
+    is_verified: bool = False
+
+    model_config = ConfigDict(frozen=True)
+
+    @classmethod
+    def from_user(cls, user) -> "CurrentUser":
+        return cls(id=user.id, username=user.username, email=user.email, is_verified=bool(user.is_verified))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "username": self.username,
+            "email": self.email,
+        }
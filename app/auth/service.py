@@ -3,18 +3,21 @@ from jose import jwt, JWTError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import HTTPException, Depends,status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from app.users.models import User
 from app.auth.model import EmailVerificationToken
-from app.database.main import get_db_session
+from app.emails.service import enqueue_verification_email
+from app.auth.schema import CurrentUser
+from app.cache import TTLCache
+from app.database.main import get_async_db_session
 from app.config import settings,get_settings
+import asyncio
 import bcrypt
 import uuid
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from sib_api_v3_sdk import Configuration, ApiClient, TransactionalEmailsApi, SendSmtpEmail
-from sib_api_v3_sdk.rest import ApiException
 
 
 
@@ -26,13 +29,37 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRES_MINUTES = int(settings.access_token_expires_minutes)
 ACCESS_TOKEN_EXPIRES_DAYS = int(settings.refresh_token_expires_days)
+BCRYPT_ROUNDS = settings.bcrypt_rounds
 
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# token subject (email) -> CurrentUser; local to this process, so the TTL bounds
+# how long another worker's change can go unseen
+user_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+def invalidate_cached_user(email: str) -> None:
+    """drop a user's cached snapshot after their data changes"""
+    user_cache.pop(email)
+
+# user id -> True for accounts deleted by this process, kept while their access tokens can still
+# be valid so a stateless token doesn't outlive its account; other workers only find out when a
+# write hits the foreign key, which the services answer with 401
+deleted_users = TTLCache(settings.user_cache_size, settings.access_token_expires_minutes * 60)
+
+def user_deleted(user_id: str, email: str) -> None:
+    """reject the deleted account's tokens from now on"""
+    invalidate_cached_user(email)
+    deleted_users.set(user_id, True)
+
+# bcrypt pins a CPU for 100ms+, so async callers hand it to a small dedicated pool
+hash_executor = None
+hash_jobs_pending = 0
 
 def hash_password(password: str) -> str:
     """hash password"""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
@@ -40,6 +67,66 @@ def verify_password(password: str, hashed_password: str) -> bool:
     """verify password against hashed password"""
     return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """check if a hash was made with a different cost than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+def get_hash_executor() -> ThreadPoolExecutor:
+    global hash_executor
+    if hash_executor is None:
+        hash_executor = ThreadPoolExecutor(
+            max_workers=settings.password_hash_workers,
+            thread_name_prefix="bcrypt"
+        )
+    return hash_executor
+
+def shutdown_hash_executor():
+    global hash_executor
+    if hash_executor is not None:
+        hash_executor.shutdown(wait=False, cancel_futures=True)
+    hash_executor = None
+
+async def run_hash_job(func, *args):
+    """run a bcrypt call in the hash pool, failing fast with 503 when its queue is full"""
+    global hash_jobs_pending
+
+    if hash_jobs_pending >= settings.password_hash_workers + settings.password_hash_queue_limit:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Try again shortly.",
+            headers={"Retry-After": "1"}
+        )
+
+    hash_jobs_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        hash_jobs_pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    """hash password without blocking the event loop"""
+    return await run_hash_job(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """verify password without blocking the event loop"""
+    return await run_hash_job(verify_password, password, hashed_password)
+
+def access_token_claims(user) -> dict:
+    """claims for a user's access token, with their identity when STATELESS_AUTH is on"""
+    claims = {"sub": user.email}
+
+    if settings.stateless_auth:
+        claims.update({
+            "uid": user.id,
+            "username": user.username,
+            "verified": bool(user.is_verified)
+        })
+    return claims
+
 def create_access_token(data:dict) -> str:
     """generates jwt access token"""
 
@@ -76,48 +163,81 @@ def verify_token(token : str, token_type : str = 'access'):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="Token invalid or expired.")
 
 
-def get_user_details(credentials: HTTPAuthorizationCredentials = Depends(security),
-                      db: Session = Depends(get_db_session)):
-    """get authenticated user's details"""
-    try:
-        payload = verify_token(credentials.credentials,"access")
-        email = payload.get('sub')
-
-        if email is None:
-            raise HTTPException(status_code=401, detail='Invalid Token')
-    except JWTError:
-        raise HTTPException(status_code=401, detail='Invalid Token')
-    
-    user = db.query(User).filter(User.email == email).first()
+async def load_current_user(email: str, db: AsyncSession) -> CurrentUser:
+    """resolve a token subject to a user snapshot, through the user cache"""
+    user = user_cache.get(email)
 
     if user is None:
-        raise HTTPException(status_code=401,detail="User not found")
-    
+        result = await db.execute(select(User).filter(User.email == email))
+        db_user = result.scalars().first()
+
+        if db_user is None:
+            raise HTTPException(status_code=401,detail="User not found")
+
+        user = CurrentUser.from_user(db_user)
+        user_cache.set(email, user)
+
+    return user
+
+def require_verified(user: CurrentUser) -> CurrentUser:
     # Check if user is verified (optional - remove if you don't want to enforce verification)
     if not user.is_verified:
         raise HTTPException(status_code=403, detail="Email not verified. Please verify your email address.")
     
     return user
 
+async def resolve_principal(payload: dict, db: AsyncSession) -> CurrentUser:
+    """the user an access token belongs to, straight from its claims when STATELESS_AUTH is on"""
+    if settings.stateless_auth and payload.get('uid'):
+        if deleted_users.get(payload['uid']):
+            raise HTTPException(status_code=401,detail="User not found")
+        # the session is shared with the route and only connects if the route queries
+        return CurrentUser(
+            id=payload['uid'],
+            username=payload.get('username', ''),
+            email=payload['sub'],
+            is_verified=bool(payload.get('verified'))
+        )
+    return await load_current_user(payload['sub'], db)
+
+async def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security),
+                                db: AsyncSession = Depends(get_async_db_session)):
+    """get the authenticated, verified user"""
+    payload = verify_token(credentials.credentials,"access")
+    return require_verified(await resolve_principal(payload, db))
+
+async def get_optional_principal(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+                                 db: AsyncSession = Depends(get_async_db_session)):
+    """the caller on public routes, only used to personalize them: None unless a valid access
+    token is sent, and unverified users count too, so this never rejects a request"""
+    if credentials is None:
+        return None
+    try:
+        payload = verify_token(credentials.credentials,"access")
+        return await resolve_principal(payload, db)
+    except HTTPException:
+        # missing, invalid or expired token, or a deleted user
+        return None
+
 
 def generate_verification_token():
     """generate a random token"""
     return str(uuid.uuid4())
 
-def create_verification_token(user_id, db: Session):
-    """create and store token for a user"""
+async def create_verification_token(user, db: AsyncSession):
+    """create and store token for a user, queueing their verification email in the same transaction"""
 
     token = generate_verification_token()
     expired_at = datetime.utcnow() + timedelta(hours=24)
 
     verification_token = EmailVerificationToken(
-        user_id=user_id,
+        user_id=user.id,
         token=token,
         expired_at=expired_at
     )
     db.add(verification_token)
-    db.commit()
-    db.refresh(verification_token)  
+    enqueue_verification_email(db, user.email, token, user.username)
+    await db.commit()
     return verification_token
 
 # def send_verification_email(user_email,token,username):
@@ -172,52 +292,11 @@ def create_verification_token(user_id, db: Session):
 #         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail=f"Error sending email :{e}")
 
 
-def send_verification_email(user_email: str, token: str, username: str):
-    """Send verification email using Brevo Transactional Email API"""
-    try:
-        verification_url = f"{settings.cors_allowed_origins}/verify-email?token={token}"
-
-        # Configure Brevo API
-        configuration = Configuration()
-        configuration.api_key['api-key'] = settings.brevo_api_key
-
-        api_instance = TransactionalEmailsApi(ApiClient(configuration))
-
-        email = SendSmtpEmail(
-            sender={"name": "Chatr Team", "email": settings.smtp_default_from_email},
-            to=[{"email": user_email, "name": username}],
-            subject="Verify Your Email Address",
-            html_content=f"""
-            <html>
-                <body>
-                    <p>Hello {username}!</p>
-                    <p>Thank you for registering. Please verify your email address by clicking the link below:</p>
-                    <p><a href="{verification_url}">Verify Email</a></p>
-                    <p>This link will expire in 24 hours.</p>
-                    <p>If you didn't create an account, please ignore this email.</p>
-                    <p>Best regards,<br>Chatr Team</p>
-                </body>
-            </html>
-            """,
-            # Disable click tracking for this email
-            params={
-                "DISABLE_CLICK_TRACKING": True
-            }
-        )
-
-        api_response = api_instance.send_transac_email(email)
-        print(f"Verification email sent to {user_email}")
-        return True
-
-    except ApiException as e:
-        # Log the error instead of raising HTTPException
-        print(f"Failed to send verification email to {user_email}: {e}")
-        return False
-
-def validate_email_token(token,db: Session) -> bool:
+async def validate_email_token(token,db: AsyncSession) -> bool:
     """validate the token returned after the user verifies their email"""
 
-    verification_token = db.query(EmailVerificationToken).filter(EmailVerificationToken.token == token).first()
+    result = await db.execute(select(EmailVerificationToken).filter(EmailVerificationToken.token == token))
+    verification_token = result.scalars().first()
 
     if not verification_token:
         return False
@@ -233,12 +312,16 @@ def validate_email_token(token,db: Session) -> bool:
     
     verification_token.used_at = now_utc
 
-    user = db.query(User).filter(User.id == verification_token.user_id).first()
+    result = await db.execute(select(User).filter(User.id == verification_token.user_id))
+    user = result.scalars().first()
 
     if user:
         user.is_verified = True
     
-    db.commit()
+    await db.commit()
+
+    if user:
+        invalidate_cached_user(user.email)
     return True
 
     
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """ Bounded in-process LRU cache whose entries expire after ttl seconds """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _stored(self, key, value) -> None:
+        """ Hook for subclasses, called under the lock after an entry is added """
+
+    def _discarded(self, key, value) -> None:
+        """ Hook for subclasses, called under the lock after an entry is removed """
+
+    def _remove(self, key) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._discarded(key, entry[1])
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._set(key, value)
+
+    def _set(self, key, value) -> None:
+        self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._stored(key, value)
+        while len(self._data) > self.maxsize:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class CachedResponse:
+    """ A serialized response body plus the ids of the rows rendered into it """
+
+    __slots__ = ("body", "headers", "ids")
+
+    def __init__(self, body: bytes, headers: dict, ids):
+        self.body = body
+        self.headers = headers
+        self.ids = frozenset(ids)
+
+
+class ResponseCache(TTLCache):
+    """ TTLCache of CachedResponse values that can be invalidated by row id.
+
+    Every invalidation bumps `generation`; a reader that started before it
+    passes the generation it saw to `set`, which then drops the stale body.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize, ttl)
+        self.generation = 0
+        self.bytes = 0
+        self._keys_by_id = {}
+
+    def _stored(self, key, value: CachedResponse) -> None:
+        self.bytes += len(value.body)
+        for id in value.ids:
+            self._keys_by_id.setdefault(id, set()).add(key)
+
+    def _discarded(self, key, value: CachedResponse) -> None:
+        self.bytes -= len(value.body)
+        for id in value.ids:
+            keys = self._keys_by_id.get(id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_id[id]
+
+    def set(self, key, value: CachedResponse, generation: int = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._set(key, value)
+
+    def invalidate(self, ids=(), predicate=None) -> None:
+        """ Drop entries rendering any of ids, and entries whose key matches predicate """
+        with self._lock:
+            self.generation += 1
+            keys = set()
+            for id in ids:
+                keys |= self._keys_by_id.get(id, set())
+            if predicate is not None:
+                keys |= {key for key in self._data if predicate(key)}
+            for key in keys:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["bytes"] = self.bytes
+        return stats
@@ -1,20 +1,25 @@
 from sqlalchemy import Column, String, ForeignKey, DateTime, UniqueConstraint, Index, func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 import uuid
-from app.database.main import Base
+from app.database.main import Base, Timestamp
 
 
 class Comment(Base):
     __tablename__ = "Comments"
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     text = Column(String(500), nullable=True)
-    user_id = Column(String(36), ForeignKey("Users.id"), nullable=False)
-    post_id = Column(String(36), ForeignKey("Posts.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    user_id = Column(String(36), ForeignKey("Users.id", ondelete="CASCADE"), nullable=False)
+    post_id = Column(String(36), ForeignKey("Posts.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now())
 
-    user = relationship("User", backref="comments")
+    user = relationship("User", backref=backref("comments", passive_deletes=True))
     post = relationship("Post", back_populates="comments")
 
+    # Match the keyset pagination order of a post's comments
+    __table_args__ = (
+        Index('ix_comments_post_id_created_at_id', 'post_id', 'created_at', 'id'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -22,7 +27,7 @@ class Comment(Base):
             "user_id": self.user_id,
             "username": self.user.username,
             "post_id": self.post_id,
-            "created_at": self.created_at.isoformat()
+            "created_at": self.created_at
         }
     
     def __repr__(self):
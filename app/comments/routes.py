@@ -1,31 +1,42 @@
-from fastapi import APIRouter, HTTPException,Depends, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException,Depends, status, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app.users.models import User
 from app.comments.models import Comment
 from app.comments.schema import CommentBase,CommentPublic
-from app.auth.service import get_user_details
-from app.database.main import get_db_session
-from app.comments.service import CommentService
+from app.auth.service import get_current_principal
+from app.auth.schema import CurrentUser
+from app.database.main import get_async_db_session
+from app.database.pagination import set_next_cursor, next_cursor_headers
+from app.config import get_settings
+from app.serialization import list_response
+from app.comments.service import AsyncCommentService
 from datetime import datetime
 
 
 router = APIRouter()
+settings = get_settings()
 
 @router.post("/comments",response_model=CommentPublic, status_code=status.HTTP_201_CREATED)
 async def create_comment(post_id : str ,comment_data : 
-                         CommentBase, db : Session = Depends(get_db_session),
-                         current_user : User = Depends(get_user_details)):
+                         CommentBase, db : AsyncSession = Depends(get_async_db_session),
+                         current_user : CurrentUser = Depends(get_current_principal)):
     
-    comment_service = CommentService(db)
-    db_comment = comment_service.create_comment(post_id, comment_data, current_user.id)
+    comment_service = AsyncCommentService(db)
+    db_comment = await comment_service.create_comment(post_id, comment_data, current_user.id)
     return CommentPublic(**db_comment.to_dict())
 
 
 @router.get("/{post_id}/comments",response_model=List[CommentPublic])
-async def get_comments(post_id : str, db :Session = Depends(get_db_session), skip : int = 0, limit : int = 10):
+async def get_comments(post_id : str, response : Response, db :AsyncSession = Depends(get_async_db_session),
+                       skip : int = 0, limit : int = 10, cursor : Optional[str] = None):
 
-    comment_service = CommentService(db)
-    comments = comment_service.get_post_comments(post_id, skip, limit)
+    comment_service = AsyncCommentService(db)
+    comments = await comment_service.get_post_comments(post_id, skip, limit, cursor)
+    if settings.fast_responses:
+        return list_response(CommentPublic, [comment.to_dict() for comment in comments],
+                             next_cursor_headers(comments, limit))
+
+    set_next_cursor(response, comments, limit)
     return [CommentPublic(**comment.to_dict()) for comment in comments]
 
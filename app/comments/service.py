@@ -1,45 +1,95 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status,Depends
 from app.posts.models import Post
 from app.comments.models import Comment
 from app.comments.schema import CommentBase
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+from app.database.pagination import paginate
+from app.posts.cache import post_changed
+from app.posts.trending import post_commented
+from app.live.hub import live_hub
 
 class CommentService:
+    """Sync reads, as checked by check_query_plans; the routes write through AsyncCommentService"""
+
     def __init__(self, db: Session):
         self.db = db
 
+    def get_post_comments(self, post_id: str, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> List[Comment]:
+        """Get comments for a specific post"""
+        # Check if post exists
+        post = self.db.query(Post).filter(Post.id == post_id).first()
+        if not post:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Post Found.")
+        
+        query = self.db.query(Comment).filter(Comment.post_id == post_id)
+        return paginate(query, Comment.created_at, Comment.id, cursor, skip, limit).all()
+
+
+class AsyncCommentService:
+    """Async counterpart of CommentService used by the API routes"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
     def validate_comment_content(self, text: str) -> None:
         """Validate comment content"""
         if not text.strip():
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Comment cannot be empty")
 
-    def create_comment(self, post_id: str, comment_data: CommentBase, user_id: str) -> Comment:
+    async def post_exists(self, post_id: str) -> bool:
+        """Check if post exists"""
+        result = await self.db.execute(select(Post.id).filter(Post.id == post_id))
+        return result.first() is not None
+
+    async def create_comment(self, post_id: str, comment_data: CommentBase, user_id: str) -> Comment:
         """Create a new comment"""
         # Check if post exists
-        post = self.db.query(Post).filter(Post.id == post_id).first()
-        if not post:
+        if not await self.post_exists(post_id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Post found.")
 
         self.validate_comment_content(comment_data.text)
-        
+
         db_comment = Comment(
             text=comment_data.text,
             user_id=user_id,
             post_id=post_id
         )
         self.db.add(db_comment)
-        self.db.commit()
-        self.db.refresh(db_comment)
-        return db_comment
+        try:
+            result = await self.db.execute(
+                update(Post).where(Post.id == post_id).values(comment_count=Post.comment_count + 1)
+                .returning(Post.comment_count)
+            )
+            comment_count = result.scalar()
+            await self.db.commit()
+        except IntegrityError:
+            # the post was deleted meanwhile, or the commenter since their token was issued
+            await self.db.rollback()
+            if not await self.post_exists(post_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Post found.")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        post_changed(post_id)
+        post_commented(post_id)
 
-    def get_post_comments(self, post_id: str, skip: int = 0, limit: int = 10) -> List[Comment]:
+        result = await self.db.execute(
+            select(Comment).options(joinedload(Comment.user))
+            .filter(Comment.id == db_comment.id).execution_options(populate_existing=True)
+        )
+        comment = result.scalars().first()
+        live_hub.publish("comment_created", dict(comment.to_dict(), comment_count=comment_count))
+        return comment
+
+    async def get_post_comments(self, post_id: str, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> List[Comment]:
         """Get comments for a specific post"""
         # Check if post exists
-        post = self.db.query(Post).filter(Post.id == post_id).first()
-        if not post:
+        if not await self.post_exists(post_id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Post Found.")
-        
-        return self.db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.created_at.desc()).offset(skip).limit(limit).all()
\ No newline at end of file
+
+        query = select(Comment).options(joinedload(Comment.user)).filter(Comment.post_id == post_id)
+        result = await self.db.execute(paginate(query, Comment.created_at, Comment.id, cursor, skip, limit))
+        return result.scalars().all()
@@ -18,6 +18,82 @@ class Settings(BaseSettings):
     brevo_api_key: str
     environment: str = "local"
 
+    # password hashing, run off the event loop in a bounded worker pool
+    bcrypt_rounds: int = Field(12, ge=4, le=31)
+    password_hash_workers: int = Field(2, ge=1)
+    password_hash_queue_limit: int = Field(32, ge=0)
+
+    # authenticated-user cache, per process; 0 disables it
+    user_cache_size: int = Field(1024, ge=0)
+    user_cache_ttl_seconds: int = Field(60, ge=1)
+
+    # carry user id, username and verification state in access tokens and trust them
+    # without a database lookup; changes show up once the client calls /refresh. A deleted
+    # account's tokens fail at once on the worker that deleted it, elsewhere on their first write
+    stateless_auth: bool = False
+
+    # token buckets on the auth routes per target email (the subject of a validly signed refresh
+    # token on /refresh) and, with rate_limit_per_ip, per client IP, checked before any hashing or
+    # database work; rate_limit_redis_url shares the buckets between workers. Only turn on
+    # rate_limit_per_ip once request.client is the real caller (uvicorn's FORWARDED_ALLOW_IPS
+    # naming the proxies), or everyone behind them shares a bucket
+    rate_limit_enabled: bool = True
+    rate_limit_per_ip: bool = False
+    rate_limit_ip_per_minute: float = Field(30, gt=0)
+    rate_limit_ip_burst: int = Field(10, ge=1)
+    rate_limit_email_per_minute: float = Field(6, gt=0)
+    rate_limit_email_burst: int = Field(5, ge=1)
+    rate_limit_redis_url: str = ""
+
+    # cached GET /posts and GET /posts/{post_id} responses, per process; 0 disables it
+    response_cache_size: int = Field(256, ge=0)
+    response_cache_ttl_seconds: int = Field(30, ge=1)
+
+    # serialize list responses straight to JSON bytes instead of through response_model
+    fast_responses: bool = False
+
+    # GET /live event streams, per process; a slow client loses its oldest queued events
+    live_queue_size: int = Field(100, ge=1)
+    live_max_subscribers: int = Field(10000, ge=0)
+    live_heartbeat_seconds: int = Field(15, ge=1)
+
+    # home timelines: a new post is copied to every follower's timeline in batches, except
+    # for accounts with more than timeline_fanout_max_followers, merged in when read instead
+    timeline_fanout_max_followers: int = Field(10000, ge=0)
+    timeline_fanout_batch_size: int = Field(1000, ge=1)
+
+    # GET /posts/trending: likes and comments weighed by age, halving every
+    # trending_half_life_hours; ranked per process and saved every trending_save_seconds
+    trending_half_life_hours: float = Field(6, gt=0)
+    trending_size: int = Field(100, ge=1)
+    trending_save_seconds: int = Field(60, ge=1)
+
+    # per-route request and query metrics served at /metrics; a request running one
+    # statement at least n_plus_one_threshold times is counted and logged as a likely N+1
+    metrics_enabled: bool = True
+    n_plus_one_threshold: int = Field(5, ge=2)
+
+    # log statements slower than slow_query_ms (0 disables); with slow_query_plan_file set,
+    # their EXPLAIN plan (ANALYZE for reads on Postgres) is appended to that rotating file
+    slow_query_ms: int = Field(0, ge=0)
+    slow_query_plan_file: str = ""
+
+    # email outbox worker (python -m app.emails.worker); "fake" only logs emails
+    email_provider: str = "brevo"
+    email_worker_batch_size: int = Field(50, ge=1)
+    email_worker_concurrency: int = Field(4, ge=1)
+    email_worker_poll_seconds: int = Field(5, ge=1)
+    email_worker_lease_seconds: int = Field(300, ge=10)
+    email_max_attempts: int = Field(5, ge=1)
+    email_retry_base_seconds: int = Field(30, ge=1)
+
+    # connection pool (ignored for sqlite, which manages its own pool)
+    db_pool_size: int = Field(5, ge=1)
+    db_max_overflow: int = Field(10, ge=0)
+    db_pool_timeout: int = Field(30, ge=1)
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+
     model_config = SettingsConfigDict(
         env_file='.env',
         env_file_encoding='utf-8',
@@ -1,15 +1,117 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event, DateTime
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from app.config import get_settings
+from app.metrics import instrument_engine, record_pool_wait
+from app.database.slow_queries import log_slow_queries
 
 Base = declarative_base()
 
+# SQLite fills server defaults from CURRENT_TIMESTAMP ("YYYY-MM-DD HH:MM:SS"), so bound
+# timestamps use the same text format there or cursor comparisons would drift
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
+# Don't initialize here, built once per process on first use
+engine = None
+SessionLocal = None
+async_engine = None
+AsyncSessionLocal = None
+
+# async drivers used in place of the sync DBAPI for each backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class _WaitTimingMixin:
+    """ Records how long callers wait for a pooled connection """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._wait_lock:
+                self.wait_count += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+            record_pool_wait(waited)
+
+
+class TimedQueuePool(_WaitTimingMixin, QueuePool):
+    """ QueuePool that records connection wait times """
+
+
+class TimedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    """ AsyncAdaptedQueuePool that records connection wait times """
+
+
+def _enable_sqlite_foreign_keys(engine) -> None:
+    """ SQLite ignores foreign keys, and so ON DELETE CASCADE, unless each connection opts in """
+
+    @event.listens_for(engine, "connect")
+    def set_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def _pool_options(settings, poolclass) -> dict:
+    """ Pool configuration shared by the sync and async engines """
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def dialect_insert(dialect_name: str):
+    """ INSERT with ON CONFLICT for the connected database; Postgres's is imported on first use """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    return sqlite.insert
+
 def get_engine():
-    settings = get_settings()  # get settings at runtime
-    return create_engine(settings.database_url)
+    global engine
+    if engine is None:
+        settings = get_settings()  # get settings at runtime
+        url = make_url(settings.database_url)
+
+        if url.get_backend_name() == "sqlite":
+            engine = create_engine(url)
+            _enable_sqlite_foreign_keys(engine)
+        else:
+            engine = create_engine(url, **_pool_options(settings, TimedQueuePool))
+        instrument_engine(engine)
+        log_slow_queries(engine)
+    return engine
 
 def get_sessionmaker():
-    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    global SessionLocal
+    if SessionLocal is None:
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return SessionLocal
 
 def get_db_session():
     """ Dependency for db session """
@@ -19,6 +121,108 @@ def get_db_session():
     finally:
         db.close()
 
+def get_async_database_url(database_url: str):
+    """ Swap the sync driver in DATABASE_URL for its async counterpart """
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for '{backend}' databases.")
+
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    connect_args = {}
+
+    # asyncpg takes ssl as a connect argument rather than libpq's sslmode
+    sslmode = url.query.get("sslmode")
+    if backend == "postgresql" and sslmode:
+        url = url.difference_update_query(["sslmode"])
+        if sslmode != "disable":
+            connect_args["ssl"] = sslmode
+
+    return url, connect_args
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        settings = get_settings()
+        url, connect_args = get_async_database_url(settings.database_url)
+
+        if url.get_backend_name() == "sqlite":
+            async_engine = create_async_engine(url, connect_args=connect_args)
+            _enable_sqlite_foreign_keys(async_engine.sync_engine)
+        else:
+            async_engine = create_async_engine(
+                url,
+                connect_args=connect_args,
+                **_pool_options(settings, TimedAsyncQueuePool),
+            )
+        instrument_engine(async_engine.sync_engine)
+        log_slow_queries(async_engine.sync_engine)
+    return async_engine
+
+def get_async_sessionmaker():
+    global AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        AsyncSessionLocal = async_sessionmaker(
+            bind=get_async_engine(),
+            autoflush=False,
+            expire_on_commit=False,  # objects are serialized after commit without another round trip
+        )
+    return AsyncSessionLocal
+
+async def get_async_db_session():
+    """ Dependency for async db session """
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+def dispose_engine():
+    """ Close pooled connections, e.g. on shutdown """
+    global engine, SessionLocal
+    if engine is not None:
+        engine.dispose()
+    engine = None
+    SessionLocal = None
+
+async def dispose_async_engine():
+    """ Close pooled async connections, e.g. on shutdown """
+    global async_engine, AsyncSessionLocal
+    if async_engine is not None:
+        await async_engine.dispose()
+    async_engine = None
+    AsyncSessionLocal = None
+
+def _pool_status(pool) -> dict:
+    status = {"pool": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+
+    if isinstance(pool, _WaitTimingMixin):
+        with pool._wait_lock:
+            status.update({
+                "wait_count": pool.wait_count,
+                "wait_time_total_ms": round(pool.wait_time_total * 1000, 3),
+                "wait_time_avg_ms": round(pool.wait_time_total * 1000 / pool.wait_count, 3) if pool.wait_count else 0.0,
+                "wait_time_max_ms": round(pool.wait_time_max * 1000, 3),
+            })
+
+    return status
+
+def get_pool_status() -> dict:
+    """ Snapshot of each engine's connection pool, used to size it against worker count """
+    status = {}
+    if engine is not None:
+        status["sync"] = _pool_status(engine.pool)
+    if async_engine is not None:
+        status["async"] = _pool_status(async_engine.sync_engine.pool)
+    return status
+
 def init_db():
     """ Create tables if they don't exist """
     from sqlalchemy import inspect
@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import literal, tuple_
+
+# clients read the next page's cursor from this header, keeping list bodies unchanged
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    """ Opaque cursor pointing just past a (created_at, id) row """
+    return _encode([created_at.isoformat(), id])
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """ Inverse of encode_cursor, 400 on anything a client tampered with """
+    try:
+        created_at, id = _decode(cursor)
+        return datetime.fromisoformat(created_at), str(id)
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def encode_score_cursor(score: float, id: str) -> str:
+    """ Cursor for lists ordered by a relevance score, such as search results """
+    return _encode([score, id])
+
+def decode_score_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        score, id = _decode(cursor)
+        return float(score), str(id)
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def paginate(query, created_at_column, id_column, cursor: Optional[str], skip: int, limit: int):
+    """ Newest first, keyed on (created_at, id); skip is only honoured without a cursor """
+    query = query.order_by(created_at_column.desc(), id_column.desc())
+
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(created_at_column, id_column)
+            < tuple_(literal(created_at, created_at_column.type), literal(id, id_column.type))
+        )
+    elif skip:
+        query = query.offset(skip)
+
+    return query.limit(limit)
+
+def next_cursor(items: Sequence, limit: int) -> Optional[str]:
+    """ Cursor for the page after items, None once the last page is reached """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
+
+def next_cursor_headers(items: Sequence, limit: int) -> dict:
+    """ Headers for a response built by hand, which skips the injected Response """
+    cursor = next_cursor(items, limit)
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    cursor = next_cursor(items, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
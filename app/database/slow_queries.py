@@ -0,0 +1,125 @@
+import logging
+import time
+from datetime import datetime, timezone
+from itertools import groupby
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import event
+from app.config import get_settings
+from app.metrics import current_route
+
+logger = logging.getLogger(__name__)
+plan_logger = logging.getLogger(f"{__name__}.plans")
+plan_logger.propagate = False
+
+PLAN_FILE_MAX_BYTES = 10 * 1024 * 1024
+PLAN_FILE_BACKUPS = 5
+# EXPLAIN ANALYZE runs the statement again, so each statement is explained at most this often
+PLAN_INTERVAL_SECONDS = 300
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+_explained_at = {}
+
+
+def parameter_shape(parameters, executemany: bool = False) -> str:
+    """ Types of the bound parameters, never their values: "(str, int x 3)" or "{id: str}" """
+    if executemany:
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}" if parameters else "[]"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        runs = [(name, len(list(group))) for name, group in groupby(type(value).__name__ for value in parameters)]
+        return "(" + ", ".join(name if count == 1 else f"{name} x {count}" for name, count in runs) + ")"
+    return type(parameters).__name__
+
+
+def _explain_statement(dialect_name: str, statement: str) -> str:
+    if dialect_name == "sqlite":
+        return "EXPLAIN QUERY PLAN " + statement
+    # ANALYZE executes the statement, only safe for reads
+    if statement.lstrip().upper().startswith("SELECT"):
+        return "EXPLAIN (ANALYZE, BUFFERS) " + statement
+    return "EXPLAIN " + statement
+
+
+def _format_plan(dialect_name: str, rows: list) -> str:
+    if dialect_name == "sqlite":
+        # (id, parent, notused, detail) rows, indented under their parent
+        depth = {0: -1}
+        lines = []
+        for row_id, parent, _, detail in rows:
+            depth[row_id] = depth.get(parent, -1) + 1
+            lines.append("  " * depth[row_id] + detail)
+        return "\n".join(lines)
+    return "\n".join(row[0] for row in rows)
+
+
+def capture_plan(conn, statement: str, parameters) -> str:
+    """ EXPLAIN the statement on the connection that ran it, without disturbing its transaction """
+    dialect_name = conn.dialect.name
+    cursor = conn.connection.dbapi_connection.cursor()
+    savepoint = dialect_name == "postgresql"
+    try:
+        if savepoint:
+            # a failing EXPLAIN would otherwise abort the caller's transaction
+            cursor.execute("SAVEPOINT slow_query_plan")
+        try:
+            cursor.execute(_explain_statement(dialect_name, statement), parameters)
+            plan = _format_plan(dialect_name, cursor.fetchall())
+        except Exception as exc:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_plan")
+            return f"EXPLAIN failed: {exc}"
+        if savepoint:
+            cursor.execute("RELEASE SAVEPOINT slow_query_plan")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+def _make_after_cursor_execute(threshold: float, capture_plans: bool):
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._slow_query_started
+        if elapsed < threshold:
+            return
+
+        route = current_route() or "-"
+        sql = " ".join(statement.split())
+        shape = parameter_shape(parameters, executemany)
+        logger.warning(f"Slow query {elapsed * 1000:.1f} ms on {route}: {sql} params={shape}")
+
+        if not capture_plans or executemany or not sql.upper().startswith(EXPLAINABLE):
+            return
+        now = time.monotonic()
+        if now - _explained_at.get(statement, -PLAN_INTERVAL_SECONDS) < PLAN_INTERVAL_SECONDS:
+            return
+        _explained_at[statement] = now
+        plan = capture_plan(conn, statement, parameters)
+        plan_logger.info(f"-- {datetime.now(timezone.utc).isoformat()} {elapsed * 1000:.1f} ms "
+                         f"{conn.dialect.name} {route}\n{sql}\n-- params {shape}\n{plan}\n")
+
+    return after_cursor_execute
+
+
+def _plan_handler(path: str) -> RotatingFileHandler:
+    handler = RotatingFileHandler(path, maxBytes=PLAN_FILE_MAX_BYTES, backupCount=PLAN_FILE_BACKUPS)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def log_slow_queries(engine) -> None:
+    """ Log statements slower than SLOW_QUERY_MS; nothing is attached while it is 0 """
+    settings = get_settings()
+    if not settings.slow_query_ms:
+        return
+
+    capture_plans = bool(settings.slow_query_plan_file)
+    if capture_plans and not plan_logger.handlers:
+        plan_logger.addHandler(_plan_handler(settings.slow_query_plan_file))
+        plan_logger.setLevel(logging.INFO)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute",
+                 _make_after_cursor_execute(settings.slow_query_ms / 1000, capture_plans))
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index, func
+import uuid
+from app.database.main import Base
+
+
+class EmailOutbox(Base):
+    """Emails waiting to be delivered by the outbox worker (app.emails.worker)"""
+    __tablename__ = 'EmailOutbox'
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    to_email = Column(String(100), nullable=False)
+    to_name = Column(String(50), nullable=True)
+    subject = Column(String(255), nullable=False)
+    html_content = Column(Text, nullable=False)
+    status = Column(String(10), nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # when the row may next be claimed; also the lease on rows a worker is sending
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, to_email={self.to_email}, status={self.status}, attempts={self.attempts})>"
@@ -0,0 +1,60 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BrevoProvider:
+    """Sends through Brevo's transactional email API, reusing one client and its connection pool"""
+
+    def __init__(self, api_key: str, sender_email: str, sender_name: str = "Chatr Team", pool_size: int = 4):
+        # imported here so only the worker process loads the SDK
+        from sib_api_v3_sdk import Configuration, ApiClient, TransactionalEmailsApi, SendSmtpEmail
+
+        configuration = Configuration()
+        configuration.api_key['api-key'] = api_key
+        configuration.connection_pool_maxsize = pool_size
+
+        self._message_class = SendSmtpEmail
+        self.api = TransactionalEmailsApi(ApiClient(configuration))
+        self.sender = {"name": sender_name, "email": sender_email}
+
+    def send(self, email) -> None:
+        """Deliver one claimed email, raising on failure"""
+        self.api.send_transac_email(self._message_class(
+            sender=self.sender,
+            to=[{"email": email.to_email, "name": email.to_name}],
+            subject=email.subject,
+            html_content=email.html_content,
+            # Disable click tracking for this email
+            params={
+                "DISABLE_CLICK_TRACKING": True
+            }
+        ))
+
+
+class FakeProvider:
+    """Records emails in memory instead of sending them, for tests and local runs"""
+
+    def __init__(self, fail_times: int = 0):
+        self.sent = []
+        self.fail_times = fail_times  # fail this many sends first, to exercise retries
+        self._lock = threading.Lock()
+
+    def send(self, email) -> None:
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise RuntimeError("Fake provider failure")
+            self.sent.append({"to": email.to_email, "name": email.to_name, "subject": email.subject})
+            logger.info(f"[fake email] to={email.to_email} subject={email.subject!r}")
+
+
+def get_provider(settings):
+    """Provider selected by EMAIL_PROVIDER"""
+    if settings.email_provider == "fake":
+        return FakeProvider()
+    if settings.email_provider == "brevo":
+        return BrevoProvider(settings.brevo_api_key, settings.smtp_default_from_email,
+                             pool_size=settings.email_worker_concurrency)
+    raise RuntimeError(f"Unknown EMAIL_PROVIDER '{settings.email_provider}'")
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+from app.emails.models import EmailOutbox
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def enqueue_email(db, to_email: str, to_name: str, subject: str, html_content: str) -> EmailOutbox:
+    """Add an email to the outbox; it is sent once the caller's transaction commits"""
+    email = EmailOutbox(
+        to_email=to_email,
+        to_name=to_name,
+        subject=subject,
+        html_content=html_content,
+        next_attempt_at=datetime.now(timezone.utc)
+    )
+    db.add(email)
+    return email
+
+def enqueue_verification_email(db, user_email: str, token: str, username: str) -> EmailOutbox:
+    """Queue the verification email sent after registration"""
+    verification_url = f"{settings.cors_allowed_origins}/verify-email?token={token}"
+
+    return enqueue_email(
+        db,
+        to_email=user_email,
+        to_name=username,
+        subject="Verify Your Email Address",
+        html_content=f"""
+            <html>
+                <body>
+                    <p>Hello {username}!</p>
+                    <p>Thank you for registering. Please verify your email address by clicking the link below:</p>
+                    <p><a href="{verification_url}">Verify Email</a></p>
+                    <p>This link will expire in 24 hours.</p>
+                    <p>If you didn't create an account, please ignore this email.</p>
+                    <p>Best regards,<br>Chatr Team</p>
+                </body>
+            </html>
+            """
+    )
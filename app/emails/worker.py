@@ -0,0 +1,127 @@
+"""
+Outbox worker: delivers queued emails outside the web process.
+Usage:
+    python -m app.emails.worker           # poll forever
+    python -m app.emails.worker --once    # drain what is due, then exit
+"""
+
+import logging
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database.main import get_sessionmaker
+from app.emails.models import EmailOutbox
+from app.emails.providers import get_provider
+
+# register every model so relationships resolve when the worker runs on its own
+from app.users.models import User
+from app.posts.models import Post
+from app.comments.models import Comment
+from app.likes.models import Like
+from app.auth.model import EmailVerificationToken
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+def retry_delay(attempts: int, base_seconds: int, max_seconds: int = 3600) -> float:
+    """Exponential backoff with jitter"""
+    delay = min(base_seconds * 2 ** (attempts - 1), max_seconds)
+    return delay * random.uniform(0.8, 1.2)
+
+class ClaimedEmail(NamedTuple):
+    """What delivery needs from a claimed row, copied out so the sending threads never touch the Session"""
+    id: str
+    to_email: str
+    to_name: Optional[str]
+    subject: str
+    html_content: str
+    attempts: int
+
+def claim_batch(db: Session, batch_size: int, lease_seconds: int):
+    """Lease due emails to this worker; rows left 'sending' by a crashed worker come back once their lease ends"""
+    now = datetime.now(timezone.utc)
+    emails = db.query(EmailOutbox).filter(
+        or_(EmailOutbox.status == PENDING, EmailOutbox.status == SENDING),
+        EmailOutbox.next_attempt_at <= now
+    ).order_by(EmailOutbox.next_attempt_at).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    for email in emails:
+        email.status = SENDING
+        email.attempts += 1
+        email.next_attempt_at = now + timedelta(seconds=lease_seconds)
+    # copied before the commit expires the rows
+    claimed = [ClaimedEmail(email.id, email.to_email, email.to_name, email.subject, email.html_content,
+                            email.attempts) for email in emails]
+    db.commit()
+    return claimed
+
+def deliver(provider, email: ClaimedEmail):
+    try:
+        provider.send(email)
+        return None
+    except Exception as e:
+        return str(e) or type(e).__name__
+
+def record_outcome(db: Session, email: ClaimedEmail, error: Optional[str], settings, now: datetime) -> None:
+    if error is None:
+        values = {"status": SENT, "sent_at": now, "last_error": None}
+    elif email.attempts >= settings.email_max_attempts:
+        values = {"status": FAILED, "last_error": error}
+        logger.error(f"Giving up on email {email.id} to {email.to_email}: {error}")
+    else:
+        values = {"status": PENDING, "last_error": error,
+                  "next_attempt_at": now + timedelta(seconds=retry_delay(email.attempts, settings.email_retry_base_seconds))}
+        logger.warning(f"Email {email.id} to {email.to_email} failed (attempt {email.attempts}): {error}")
+    db.execute(update(EmailOutbox).where(EmailOutbox.id == email.id).values(**values)
+               .execution_options(synchronize_session=False))
+
+def drain_once(db: Session, provider, executor: ThreadPoolExecutor, settings) -> int:
+    """Send one batch of due emails and record the outcome of each; returns how many were claimed"""
+    emails = claim_batch(db, settings.email_worker_batch_size, settings.email_worker_lease_seconds)
+    if not emails:
+        return 0
+
+    # the pool threads only see plain tuples; outcomes are written here, on the Session's own thread
+    errors = list(executor.map(lambda email: deliver(provider, email), emails))
+    now = datetime.now(timezone.utc)
+    for email, error in zip(emails, errors):
+        record_outcome(db, email, error, settings, now)
+    db.commit()
+
+    sent = errors.count(None)
+    logger.info(f"Outbox batch: {sent} sent, {len(emails) - sent} failed")
+    return len(emails)
+
+def run(once: bool = False, provider=None) -> None:
+    settings = get_settings()
+    provider = provider or get_provider(settings)
+    executor = ThreadPoolExecutor(max_workers=settings.email_worker_concurrency, thread_name_prefix="outbox")
+    db = get_sessionmaker()()
+
+    try:
+        while True:
+            claimed = drain_once(db, provider, executor, settings)
+            if claimed:
+                continue  # more may be due right away
+            if once:
+                break
+            time.sleep(settings.email_worker_poll_seconds)
+    finally:
+        db.close()
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    run(once="--once" in sys.argv[1:])
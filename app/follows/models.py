@@ -0,0 +1,35 @@
+from sqlalchemy import Column, String, ForeignKey, Index, PrimaryKeyConstraint, func
+from app.database.main import Base, Timestamp
+
+
+class Follow(Base):
+    __tablename__ = "Follows"
+    follower_id = Column(String(36), ForeignKey("Users.id", ondelete="CASCADE"), nullable=False)
+    followee_id = Column(String(36), ForeignKey("Users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now())
+
+    # indexed both ways: who someone follows (the key), and who follows them for fan-out
+    __table_args__ = (
+        PrimaryKeyConstraint('follower_id', 'followee_id'),
+        Index('ix_follows_followee_id_follower_id', 'followee_id', 'follower_id'),
+    )
+
+    def __repr__(self):
+        return f"<Follow(follower_id={self.follower_id}, followee_id={self.followee_id})>"
+
+
+class TimelineEntry(Base):
+    """ A post in someone's home timeline, copied there when it was written """
+    __tablename__ = "HomeTimelines"
+    user_id = Column(String(36), ForeignKey("Users.id", ondelete="CASCADE"), nullable=False)
+    post_id = Column(String(36), ForeignKey("Posts.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(Timestamp, nullable=False)
+
+    # the key is the read order, so a page is one range scan; post_id serves the delete cascade
+    __table_args__ = (
+        PrimaryKeyConstraint('user_id', 'created_at', 'post_id'),
+        Index('ix_hometimelines_post_id', 'post_id'),
+    )
+
+    def __repr__(self):
+        return f"<TimelineEntry(user_id={self.user_id}, post_id={self.post_id})>"
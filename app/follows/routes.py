@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.service import get_current_principal
+from app.auth.schema import CurrentUser
+from app.database.main import get_async_db_session
+from app.follows.schema import FollowResponse
+from app.follows.service import AsyncFollowService
+
+
+router = APIRouter()
+
+@router.post("/users/{user_id}/follow", response_model=FollowResponse, status_code=status.HTTP_201_CREATED)
+async def follow_user(user_id: str, current_user: CurrentUser = Depends(get_current_principal),
+                      db: AsyncSession = Depends(get_async_db_session)):
+    """Follow a user; their new posts go to the current user's home timeline"""
+    follow_service = AsyncFollowService(db)
+    follower_count = await follow_service.follow(current_user.id, user_id)
+    return FollowResponse(follower_id=current_user.id, followee_id=user_id, follower_count=follower_count)
+
+
+@router.delete("/users/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+async def unfollow_user(user_id: str, current_user: CurrentUser = Depends(get_current_principal),
+                        db: AsyncSession = Depends(get_async_db_session)):
+    follow_service = AsyncFollowService(db)
+    await follow_service.unfollow(current_user.id, user_id)
+    return None
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class FollowResponse(BaseModel):
+    follower_id: str
+    followee_id: str
+    follower_count: int
@@ -0,0 +1,187 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, literal, tuple_
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException, status
+from app.follows.models import Follow, TimelineEntry
+from app.posts.models import Post
+from app.users.models import User
+from app.config import get_settings
+from app.database.main import dialect_insert
+from typing import List
+
+settings = get_settings()
+
+# a new follow brings this many of the followee's latest posts into the follower's timeline
+FOLLOW_BACKFILL_POSTS = 50
+# most accounts above the fan-out limit merged into one home timeline page
+MAX_MERGED_ACCOUNTS = 100
+
+
+def fans_out(follower_count: int) -> bool:
+    """ Whether a post is copied to every follower when written, rather than merged in when read """
+    return follower_count <= settings.timeline_fanout_max_followers
+
+
+def merged_follower_count() -> int:
+    # merging from half the limit up means an account that drops back under it still has the
+    # posts it wrote meanwhile shown; anything also fanned out is deduplicated by the UNION
+    return settings.timeline_fanout_max_followers // 2
+
+
+def insert_ignoring_duplicates(dialect_name: str, model):
+    insert = dialect_insert(dialect_name)
+    return insert(model).on_conflict_do_nothing()
+
+
+def follower_batch(user_id: str, after: str):
+    """ The next batch of followers, keyset on follower_id over the (followee_id, follower_id) index """
+    return select(Follow.follower_id).where(
+        Follow.followee_id == user_id, Follow.follower_id > after
+    ).order_by(Follow.follower_id).limit(settings.timeline_fanout_batch_size)
+
+
+def timeline_backfill(dialect_name: str, follower_id: str, followee_id: str):
+    latest = select(literal(follower_id), Post.id, Post.created_at).where(
+        Post.user_id == followee_id
+    ).order_by(Post.created_at.desc(), Post.id.desc()).limit(FOLLOW_BACKFILL_POSTS)
+    return insert_ignoring_duplicates(dialect_name, TimelineEntry).from_select(
+        [TimelineEntry.user_id, TimelineEntry.post_id, TimelineEntry.created_at], latest
+    )
+
+
+def timeline_cleanup(follower_id: str, followee_id: str):
+    """ Take an unfollowed account's posts out of the timeline, each found by its full key """
+    return delete(TimelineEntry).where(
+        TimelineEntry.user_id == follower_id,
+        tuple_(TimelineEntry.created_at, TimelineEntry.post_id).in_(
+            select(Post.created_at, Post.id).where(Post.user_id == followee_id)
+        ),
+    ).execution_options(synchronize_session=False)
+
+
+def merged_accounts_query(user_id: str):
+    """ Followed accounts whose posts are read from Posts; starts from the few above the limit """
+    followed = select(Follow.followee_id).where(
+        Follow.follower_id == user_id, Follow.followee_id == User.id
+    ).exists()
+    return select(User.id).where(User.follower_count > merged_follower_count(), followed).order_by(
+        User.follower_count.desc()
+    ).limit(MAX_MERGED_ACCOUNTS)
+
+
+def change_follower_count(user_id: str, delta: int):
+    return update(User).where(User.id == user_id).values(
+        follower_count=User.follower_count + delta
+    ).returning(User.follower_count)
+
+
+def validate_follow(follower_id: str, followee_id: str) -> None:
+    if follower_id == followee_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You cannot follow yourself.")
+
+
+class FollowService:
+    """Sync timeline queries, as checked by check_query_plans; the routes use AsyncFollowService"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def fan_out(self, post: Post) -> int:
+        """Copy a new, flushed post into its author's and followers' home timelines, without committing"""
+        insert_entries = insert_ignoring_duplicates(self.db.get_bind().dialect.name, TimelineEntry)
+        entry = {"post_id": post.id, "created_at": post.created_at}
+        self.db.execute(insert_entries, [{"user_id": post.user_id, **entry}])
+
+        follower_count = self.db.execute(select(User.follower_count).where(User.id == post.user_id)).scalar()
+        if not fans_out(follower_count):
+            return 0
+
+        reached, after = 0, ""
+        while True:
+            followers = self.db.execute(follower_batch(post.user_id, after)).scalars().all()
+            if followers:
+                self.db.execute(insert_entries, [{"user_id": follower_id, **entry} for follower_id in followers])
+                reached += len(followers)
+            if len(followers) < settings.timeline_fanout_batch_size:
+                return reached
+            after = followers[-1]
+
+    def get_merged_accounts(self, user_id: str) -> List[str]:
+        return self.db.execute(merged_accounts_query(user_id)).scalars().all()
+
+
+class AsyncFollowService:
+    """Async counterpart of FollowService used by the API routes"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def follow(self, follower_id: str, followee_id: str) -> int:
+        """Follow an account and fill in its latest posts; returns its new follower count"""
+        validate_follow(follower_id, followee_id)
+        dialect_name = self.db.get_bind().dialect.name
+        statement = insert_ignoring_duplicates(dialect_name, Follow).values(
+            follower_id=follower_id, followee_id=followee_id
+        ).returning(Follow.followee_id)
+        try:
+            followed = (await self.db.execute(statement)).first()
+        except IntegrityError:
+            # the foreign key rejects follows of accounts that don't exist, and by accounts
+            # deleted since their token was issued
+            await self.db.rollback()
+            exists = await self.db.execute(select(User.id).filter(User.id == followee_id))
+            if exists.first() is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+
+        if followed is None:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Already following.")
+
+        follower_count = (await self.db.execute(change_follower_count(followee_id, 1))).scalar()
+        if fans_out(follower_count):
+            await self.db.execute(timeline_backfill(dialect_name, follower_id, followee_id))
+        await self.db.commit()
+        return follower_count
+
+    async def unfollow(self, follower_id: str, followee_id: str) -> int:
+        """Unfollow an account and drop its posts from the home timeline; returns its new follower count"""
+        result = await self.db.execute(
+            delete(Follow).where(Follow.follower_id == follower_id, Follow.followee_id == followee_id)
+            .returning(Follow.followee_id)
+        )
+
+        if result.first() is None:
+            # nothing deleted: tell a missing account from one that wasn't followed
+            exists = await self.db.execute(select(User.id).filter(User.id == followee_id))
+            if exists.first() is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not following.")
+
+        follower_count = (await self.db.execute(change_follower_count(followee_id, -1))).scalar()
+        await self.db.execute(timeline_cleanup(follower_id, followee_id))
+        await self.db.commit()
+        return follower_count
+
+    async def fan_out(self, post: Post) -> int:
+        """Copy a new, flushed post into its author's and followers' home timelines, without committing"""
+        insert_entries = insert_ignoring_duplicates(self.db.get_bind().dialect.name, TimelineEntry)
+        entry = {"post_id": post.id, "created_at": post.created_at}
+        await self.db.execute(insert_entries, [{"user_id": post.user_id, **entry}])
+
+        result = await self.db.execute(select(User.follower_count).where(User.id == post.user_id))
+        if not fans_out(result.scalar()):
+            return 0
+
+        reached, after = 0, ""
+        while True:
+            followers = (await self.db.execute(follower_batch(post.user_id, after))).scalars().all()
+            if followers:
+                await self.db.execute(insert_entries, [{"user_id": follower_id, **entry} for follower_id in followers])
+                reached += len(followers)
+            if len(followers) < settings.timeline_fanout_batch_size:
+                return reached
+            after = followers[-1]
+
+    async def get_merged_accounts(self, user_id: str) -> List[str]:
+        return (await self.db.execute(merged_accounts_query(user_id))).scalars().all()
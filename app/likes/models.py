@@ -1,5 +1,5 @@
 from sqlalchemy import Column, String, ForeignKey, DateTime, UniqueConstraint, Index, func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, backref
 import uuid
 from app.database.main import Base
 
@@ -7,14 +7,17 @@ from app.database.main import Base
 class Like(Base):
     __tablename__ = "Likes"
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
-    user_id = Column(String(36), ForeignKey("Users.id"), nullable=False)
-    post_id = Column(String(36), ForeignKey("Posts.id"), nullable=False)
+    user_id = Column(String(36), ForeignKey("Users.id", ondelete="CASCADE"), nullable=False)
+    post_id = Column(String(36), ForeignKey("Posts.id", ondelete="CASCADE"), nullable=False)
 
-    user = relationship("User", backref="likes")
+    user = relationship("User", backref=backref("likes", passive_deletes=True))
     post = relationship("Post", back_populates="likes")
     
-    # Prevent duplicate likes
-    __table_args__ = (UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),)
+    # Prevent duplicate likes; its (user_id, post_id) index also serves lookups by user
+    __table_args__ = (
+        UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),
+        Index('ix_likes_post_id', 'post_id'),
+    )
 
     def to_dict(self):
         """Convert like object to dictionary"""
@@ -1,35 +1,48 @@
 from fastapi import APIRouter, HTTPException,Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from app.users.models import User
-from app.likes.schema import LikeResponse,LikeCreate
-from app.auth.service import get_user_details
-from app.database.main import get_db_session
-from app.likes.service import LikeService
+from app.likes.schema import LikeResponse,LikeCreate,LikeBatchRequest,LikeBatchResponse
+from app.auth.service import get_current_principal
+from app.auth.schema import CurrentUser
+from app.database.main import get_async_db_session
+from app.likes.service import AsyncLikeService
 from datetime import datetime
 
 
 router = APIRouter()
 
 @router.post("/likes",response_model=LikeResponse,status_code=status.HTTP_201_CREATED)
-async def like_post(post_id : str , current_user : User = Depends(get_user_details), 
-                    db: Session = Depends(get_db_session)):
+async def like_post(post_id : str , current_user : CurrentUser = Depends(get_current_principal), 
+                    db: AsyncSession = Depends(get_async_db_session)):
     
-    like_service = LikeService(db)
-    new_like = like_service.like_post(post_id, current_user.id)
-    return LikeResponse(**new_like.to_dict())
+    like_service = AsyncLikeService(db)
+    new_like = await like_service.like_post(post_id, current_user.id)
+    return LikeResponse(id=new_like.id, user_id=new_like.user_id, post_id=new_like.post_id,
+                        username=current_user.username)
 
 
 @router.delete("/likes",status_code=status.HTTP_204_NO_CONTENT)
-async def unlike(post_id : str, db : Session = Depends(get_db_session),current_user :User=Depends(get_user_details)):
+async def unlike(post_id : str, db : AsyncSession = Depends(get_async_db_session),current_user :CurrentUser=Depends(get_current_principal)):
 
-    like_service = LikeService(db)
-    like_service.unlike_post(post_id, current_user.id)
+    like_service = AsyncLikeService(db)
+    await like_service.unlike_post(post_id, current_user.id)
     return None
 
+@router.post("/likes/batch",response_model=LikeBatchResponse)
+async def batch_likes(batch : LikeBatchRequest, current_user : CurrentUser = Depends(get_current_principal),
+                      db: AsyncSession = Depends(get_async_db_session)):
+    """Like and unlike many posts in one transaction, with a result per post"""
+    if not batch.like and not batch.unlike:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nothing to like or unlike")
+
+    like_service = AsyncLikeService(db)
+    results = await like_service.batch_update_likes(batch.like, batch.unlike, current_user.id)
+    return LikeBatchResponse(results=results)
+
 @router.get("/user/likes")
-async def get_user_likes(current_user: User = Depends(get_user_details), db: Session = Depends(get_db_session)):
+async def get_user_likes(current_user: CurrentUser = Depends(get_current_principal), db: AsyncSession = Depends(get_async_db_session)):
     """Get all posts liked by the current user"""
-    like_service = LikeService(db)
-    likes = like_service.get_user_likes(current_user.id)
+    like_service = AsyncLikeService(db)
+    likes = await like_service.get_user_likes(current_user.id)
     return [{"post_id": like.post_id} for like in likes]
\ No newline at end of file
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.posts.schema import MAX_BATCH_SIZE
 
 class LikeBase(BaseModel):
     user_id: str
@@ -12,4 +14,17 @@ class LikeResponse(LikeBase):
     username: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class LikeBatchRequest(BaseModel):
+    like: List[str] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    unlike: List[str] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+
+class LikeBatchItem(BaseModel):
+    post_id: str
+    action: str
+    success: bool
+    error: Optional[str] = None
+
+class LikeBatchResponse(BaseModel):
+    results: List[LikeBatchItem]
@@ -1,58 +1,204 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update, delete
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status,Depends
 from app.posts.models import Post
+from app.users.models import User
 from app.likes.models import  Like
-from typing import List
+from app.database.main import dialect_insert
+from typing import List, Tuple
+from app.posts.cache import post_changed
+from app.posts.trending import post_liked, post_unliked
+from app.live.hub import live_hub
+
+def plan_like_batch(like_ids: List[str], unlike_ids: List[str],
+                    existing_post_ids: set) -> Tuple[List[str], List[str], List[dict]]:
+    """Split a batch into posts to like, posts to unlike and per-item results"""
+    to_like, to_unlike, results = [], [], []
+    conflicting = set(like_ids) & set(unlike_ids)
+
+    for action, post_ids in (("like", like_ids), ("unlike", unlike_ids)):
+        for post_id in dict.fromkeys(post_ids):
+            if post_id in conflicting:
+                error = "Cannot like and unlike the same post."
+            elif post_id not in existing_post_ids:
+                error = "No Post Found."
+            else:
+                error = None
+                (to_like if action == "like" else to_unlike).append(post_id)
+
+            results.append({"post_id": post_id, "action": action, "success": error is None, "error": error})
+
+    return to_like, to_unlike, results
+
+def settle_like_batch(results: List[dict], liked: set, unliked: set) -> None:
+    """Fail the planned items whose row the INSERT or DELETE didn't return"""
+    for item in results:
+        if not item["success"]:
+            continue
+        if item["action"] == "like" and item["post_id"] not in liked:
+            item.update(success=False, error="Already liked.")
+        elif item["action"] == "unlike" and item["post_id"] not in unliked:
+            item.update(success=False, error="Not Liked")
+
+def insert_like(dialect_name: str, post_id: str, user_id: str):
+    """INSERT ... ON CONFLICT (user_id, post_id) DO NOTHING RETURNING the like; no row back means already liked"""
+    insert = dialect_insert(dialect_name)
+    return insert(Like).values(user_id=user_id, post_id=post_id).on_conflict_do_nothing(
+        index_elements=[Like.user_id, Like.post_id]
+    ).returning(Like)
+
+def insert_likes(dialect_name: str, post_ids: List[str], user_id: str):
+    """insert_like for many posts at once, RETURNING the post ids that weren't already liked"""
+    insert = dialect_insert(dialect_name)
+    rows = [{"user_id": user_id, "post_id": post_id} for post_id in post_ids]
+    return insert(Like).values(rows).on_conflict_do_nothing(
+        index_elements=[Like.user_id, Like.post_id]
+    ).returning(Like.post_id)
+
+def like_changed(event: str, post_id: str, user_id: str, like_count: int) -> None:
+    """Tell the caches, the trending ranking and live subscribers about a committed like or unlike"""
+    post_changed(post_id)
+    (post_liked if event == "post_liked" else post_unliked)(post_id)
+    live_hub.publish(event, {"post_id": post_id, "user_id": user_id, "like_count": like_count})
+
 
 class LikeService:
+    """Sync reads, as checked by check_query_plans; the routes write through AsyncLikeService"""
+
     def __init__(self, db: Session):
         self.db = db
 
-    def like_post(self, post_id: str, user_id: str) -> Like:
+    def get_user_likes(self, user_id: str) -> List[Like]:
+        """Get all likes by a user"""
+        return self.db.query(Like).filter(Like.user_id == user_id).all()
+
+    def get_liked_post_ids(self, user_id: str, post_ids: List[str]) -> set:
+        """Which of post_ids the user has liked"""
+        if not post_ids:
+            return set()
+        return {row[0] for row in self.db.query(Like.post_id).filter(Like.user_id == user_id, Like.post_id.in_(post_ids))}
+
+
+class AsyncLikeService:
+    """Async counterpart of LikeService used by the API routes"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def post_exists(self, post_id: str) -> bool:
+        """Check if post exists"""
+        result = await self.db.execute(select(Post.id).filter(Post.id == post_id))
+        return result.first() is not None
+
+    async def user_exists(self, user_id: str) -> bool:
+        """Check if user exists"""
+        result = await self.db.execute(select(User.id).filter(User.id == user_id))
+        return result.first() is not None
+
+    async def get_like(self, post_id: str, user_id: str) -> Like:
+        """Get a user's like on a post"""
+        result = await self.db.execute(
+            select(Like).filter(Like.user_id == user_id, Like.post_id == post_id)
+        )
+        return result.scalars().first()
+
+    async def like_post(self, post_id: str, user_id: str) -> Like:
         """Like a post"""
-        # Check if post exists
-        post = self.db.query(Post).filter(Post.id == post_id).first()
-        if not post:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Post Found.")
-        
-        # Check if already liked
-        existing_like = self.db.query(Like).filter(
-            Like.user_id == user_id, 
-            Like.post_id == post_id
-        ).first()
-
-        if existing_like:
+        try:
+            result = await self.db.execute(insert_like(self.db.get_bind().dialect.name, post_id, user_id))
+            like = result.scalars().first()
+        except IntegrityError:
+            # the foreign key rejects likes on posts that don't exist, and by accounts deleted
+            # since their token was issued
+            await self.db.rollback()
+            if not await self.post_exists(post_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Post Found.")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+
+        if like is None:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Already liked.")
-            
-        new_like = Like(
-            user_id=user_id,
-            post_id=post_id
+
+        result = await self.db.execute(
+            update(Post).where(Post.id == post_id).values(like_count=Post.like_count + 1).returning(Post.like_count)
         )
-        self.db.add(new_like)
-        self.db.commit()
-        self.db.refresh(new_like)
-        return new_like
+        like_count = result.scalar()
+        await self.db.commit()
+        like_changed("post_liked", post_id, user_id, like_count)
+        return like
 
-    def unlike_post(self, post_id: str, user_id: str) -> None:
+    async def unlike_post(self, post_id: str, user_id: str) -> None:
         """Unlike a post"""
-        # Check if post exists
-        post = self.db.query(Post).filter(Post.id == post_id).first()
-        if not post:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No post Found.")
-        
-        # Check if liked
-        liked = self.db.query(Like).filter(
-            Like.user_id == user_id, 
-            Like.post_id == post_id
-        ).first()
-
-        if not liked:
+        result = await self.db.execute(
+            delete(Like).where(Like.user_id == user_id, Like.post_id == post_id).returning(Like.id)
+        )
+
+        if result.first() is None:
+            # nothing deleted: tell a missing post from one that wasn't liked
+            if not await self.post_exists(post_id):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No post Found.")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not Liked")
-        
-        self.db.delete(liked)
-        self.db.commit()
 
-    def get_user_likes(self, user_id: str) -> List[Like]:
+        result = await self.db.execute(
+            update(Post).where(Post.id == post_id).values(like_count=Post.like_count - 1).returning(Post.like_count)
+        )
+        like_count = result.scalar()
+        await self.db.commit()
+        like_changed("post_unliked", post_id, user_id, like_count)
+
+    async def get_user_likes(self, user_id: str) -> List[Like]:
         """Get all likes by a user"""
-        return self.db.query(Like).filter(Like.user_id == user_id).all()
\ No newline at end of file
+        result = await self.db.execute(select(Like).filter(Like.user_id == user_id))
+        return result.scalars().all()
+
+    async def get_liked_post_ids(self, user_id: str, post_ids: List[str]) -> set:
+        """Which of post_ids the user has liked"""
+        if not post_ids:
+            return set()
+        result = await self.db.execute(
+            select(Like.post_id).filter(Like.user_id == user_id, Like.post_id.in_(post_ids))
+        )
+        return set(result.scalars().all())
+
+    async def batch_update_likes(self, like_ids: List[str], unlike_ids: List[str], user_id: str) -> List[dict]:
+        """Like and unlike many posts in one transaction"""
+        post_ids = set(like_ids) | set(unlike_ids)
+        result = await self.db.execute(select(Post.id).filter(Post.id.in_(post_ids)))
+        existing = set(result.scalars().all())
+        to_like, to_unlike, results = plan_like_batch(like_ids, unlike_ids, existing)
+
+        # only the rows these statements return changed, whatever a concurrent request did
+        liked, unliked, like_counts = set(), set(), {}
+        if to_like:
+            try:
+                result = await self.db.execute(insert_likes(self.db.get_bind().dialect.name, to_like, user_id))
+            except IntegrityError:
+                # an account deleted since its token was issued, or a post deleted since the check above
+                await self.db.rollback()
+                if not await self.user_exists(user_id):
+                    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No Post Found.")
+            liked = set(result.scalars().all())
+        if to_unlike:
+            result = await self.db.execute(
+                delete(Like).where(Like.user_id == user_id, Like.post_id.in_(to_unlike)).returning(Like.post_id)
+            )
+            unliked = set(result.scalars().all())
+        for changed, delta in ((liked, 1), (unliked, -1)):
+            if changed:
+                result = await self.db.execute(
+                    update(Post).where(Post.id.in_(changed)).values(like_count=Post.like_count + delta)
+                    .returning(Post.id, Post.like_count)
+                )
+                like_counts.update(result.all())
+
+        settle_like_batch(results, liked, unliked)
+        if like_counts:
+            await self.db.commit()
+            for post_id in liked:
+                like_changed("post_liked", post_id, user_id, like_counts[post_id])
+            for post_id in unliked:
+                like_changed("post_unliked", post_id, user_id, like_counts[post_id])
+
+        return results
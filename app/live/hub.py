@@ -0,0 +1,73 @@
+import asyncio
+import itertools
+from app.config import get_settings
+from app.serialization import dumps
+
+settings = get_settings()
+
+
+class Subscription:
+    """ One open stream: a bounded queue of encoded events waiting to be written """
+
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+
+class EventHub:
+    """ In-process pub/sub that fans events out to every open live stream.
+
+    Each event is encoded once as a Server-Sent Events frame and shared by all
+    subscribers. A subscriber whose queue is full loses its oldest event; ids
+    are sequential, so a client that sees a gap knows to refetch.
+    """
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> Subscription:
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: str, data: dict) -> None:
+        """ Queue an event for every subscriber, from the event loop; free when nobody is listening """
+        if not self._subscribers:
+            return
+
+        frame = b"id: %d\nevent: %s\ndata: %s\n\n" % (next(self._ids), event.encode(), dumps(data))
+        self.published += 1
+        for subscription in list(self._subscribers):
+            queue = subscription.queue
+            if queue.full():
+                queue.get_nowait()
+                subscription.dropped += 1
+                self.dropped += 1
+            queue.put_nowait(frame)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+live_hub = EventHub(settings.live_queue_size, settings.live_max_subscribers)
@@ -0,0 +1,44 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app.config import get_settings
+from app.live.hub import live_hub, Subscription
+
+router = APIRouter()
+settings = get_settings()
+
+# tell EventSource how long to wait before reconnecting, in milliseconds
+RETRY_FRAME = b"retry: 3000\n\n"
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+async def event_stream(request: Request, subscription: Subscription):
+    try:
+        yield RETRY_FRAME
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscription.queue.get(), settings.live_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # an idle stream still writes now and then, so proxies keep it open and dead peers surface
+                if await request.is_disconnected():
+                    break
+                frame = KEEPALIVE_FRAME
+            yield frame
+    finally:
+        live_hub.unsubscribe(subscription)
+
+
+@router.get("/live")
+async def live_feed(request: Request):
+    """Server-Sent Events stream of new posts, comments and likes"""
+    subscription = live_hub.subscribe()
+    if subscription is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Too many live connections, poll /posts instead",
+                            headers={"Retry-After": str(settings.live_heartbeat_seconds)})
+
+    return StreamingResponse(
+        event_stream(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
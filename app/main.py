@@ -1,14 +1,21 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
+import asyncio
 import os
 import logging
-from app.database.main import init_db
+from app.database.main import init_db, dispose_engine, get_pool_status, dispose_async_engine
 from app.config import get_settings
+from app.database.pagination import NEXT_CURSOR_HEADER
+from app.posts.cache import post_response_cache
+from app.posts.trending import trending_posts, save_trending, save_trending_periodically
+from app.live.hub import live_hub
+from app.auth.service import shutdown_hash_executor, user_cache
+from app.metrics import MetricsMiddleware, collectors, render_metrics, sample_lines
 
 # setting up logging
 logging.basicConfig(level=logging.INFO)
@@ -61,21 +68,32 @@ app.add_middleware(
     allow_origins=allowed_origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER]
 )
 
+# outermost, so latency includes every other middleware
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include modular routers
 from app.auth.routes import router as auth_router
 from app.users.routes import router as users_router
 from app.posts.routes import router as posts_router
 from app.comments.routes import router as comments_router
 from app.likes.routes import router as likes_router
+from app.live.routes import router as live_router
+from app.search.routes import router as search_router
+from app.follows.routes import router as follows_router
 
 app.include_router(auth_router, prefix='/api', tags=['auth'])
 app.include_router(users_router, prefix='/api', tags=['users'])
 app.include_router(posts_router, prefix='/api', tags=['posts'])
 app.include_router(comments_router, prefix='/api', tags=['comments'])
 app.include_router(likes_router, prefix='/api', tags=['likes'])
+app.include_router(live_router, prefix='/api', tags=['live'])
+app.include_router(search_router, prefix='/api', tags=['search'])
+app.include_router(follows_router, prefix='/api', tags=['follows'])
 
 
 
@@ -87,18 +105,93 @@ async def health_check():
     """Health check endpoint for monitoring"""
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/health/db")
+async def db_pool_status():
+    """Connection pool usage for sizing the pool against worker count"""
+    return get_pool_status()
+
+@app.get("/health/cache")
+async def cache_status():
+    """Hit/miss counters for the in-process caches"""
+    return {
+        "users": user_cache.stats(),
+        "post_responses": post_response_cache.stats(),
+    }
+
+@app.get("/health/live")
+async def live_status():
+    """Open live streams and events dropped for slow clients"""
+    return live_hub.stats()
+
+def process_metrics() -> list:
+    """Pool, cache and live stream state, read only when /metrics is scraped"""
+    pools = get_pool_status()
+    caches = {"users": user_cache.stats(), "post_responses": post_response_cache.stats()}
+    live = live_hub.stats()
+
+    pool_gauges = [(pool, name, status[name]) for pool, status in pools.items()
+                   for name in ("checked_out", "overflow") if name in status]
+    return (
+        sample_lines("chatr_db_pool_connections", "Pooled connections by state", "gauge",
+                     [((pool, name), value) for pool, name, value in pool_gauges], ("pool", "state"))
+        + sample_lines("chatr_db_pool_waits_total", "Connections handed out by the pool", "counter",
+                       [((pool,), status["wait_count"]) for pool, status in pools.items()
+                        if "wait_count" in status], ("pool",))
+        + sample_lines("chatr_db_pool_wait_seconds_total", "Time spent waiting for a pooled connection", "counter",
+                       [((pool,), status["wait_time_total_ms"] / 1000) for pool, status in pools.items()
+                        if "wait_count" in status], ("pool",))
+        + sample_lines("chatr_cache_lookups_total", "Cache lookups by result", "counter",
+                       [((cache, result), stats[key]) for cache, stats in caches.items()
+                        for result, key in (("hit", "hits"), ("miss", "misses"))], ("cache", "result"))
+        + sample_lines("chatr_cache_entries", "Entries held per cache", "gauge",
+                       [((cache,), stats["size"]) for cache, stats in caches.items()], ("cache",))
+        + sample_lines("chatr_live_subscribers", "Open live event streams", "gauge", [((), live["subscribers"])])
+        + sample_lines("chatr_live_events_dropped_total", "Events dropped for slow live clients", "counter",
+                       [((), live["dropped"])])
+        + sample_lines("chatr_trending_candidates", "Posts followed by the trending ranking", "gauge",
+                       [((), len(trending_posts))])
+    )
+
+collectors.append(process_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition, rendered only when scraped"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # -------------------------
 # Startup Event
 # -------------------------
+trending_saver = None
+
 @app.on_event("startup")
 async def startup():
-    """Initialize database on startup"""
-
+    """Initialize database on startup; connections are only opened by the first request"""
+    global trending_saver
+
+    # production schemas come from migrations, so a cold start skips the inspection round trip
+    if settings.environment != "production":
+        try:
+            init_db()
+            logger.info("Database initialized successfully.")
+        except Exception as e:
+            logger.error(f"Error initializing database: {str(e)}")
+
+    # the saved trending ranking is loaded by the first trending read or save, not here
+    trending_saver = asyncio.create_task(save_trending_periodically())
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Save the trending ranking and release pooled database connections"""
+    if trending_saver is not None:
+        trending_saver.cancel()
     try:
-        init_db()
-        logger.info("Database initialized successfully.")
+        await save_trending()
     except Exception as e:
-        logger.error(f"Error initializing database: {str(e)}")
+        logger.error(f"Error saving trending posts: {str(e)}")
+    await dispose_async_engine()
+    dispose_engine()
+    shutdown_hash_executor()
 
 # -------------------------
 # Serve Frontend (Optional)
@@ -0,0 +1,252 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labelnames: tuple, labels: tuple) -> str:
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, labels):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """ A metric family: one value (or histogram) per label set, rendered on scrape """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._series = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list:
+        with self._lock:
+            series = list(self._series.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                                for labels, value in series]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple, labelnames: tuple = ()):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # one count per bucket plus +Inf, then the sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+
+        lines = self.header()
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+def sample_lines(name: str, help: str, kind: str, samples: list, labelnames: tuple = ()) -> list:
+    """ Exposition lines for values read at scrape time, samples are (labels, value) pairs """
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+    return lines
+
+
+registry = []
+collectors = []  # callables returning extra exposition lines, run only on scrape
+
+http_requests = Counter("chatr_http_requests_total", "HTTP responses by route and status",
+                        ("method", "route", "status"))
+http_latency = Histogram("chatr_http_request_duration_seconds", "Time to serve a request",
+                         LATENCY_BUCKETS, ("method", "route"))
+db_queries = Histogram("chatr_db_queries_per_request", "SQL statements issued while serving a request",
+                       QUERY_COUNT_BUCKETS, ("method", "route"))
+pool_wait = Histogram("chatr_db_pool_wait_per_request_seconds",
+                      "Time spent waiting for a pooled connection while serving a request",
+                      DB_TIME_BUCKETS, ("method", "route"))
+db_time = Histogram("chatr_db_time_per_request_seconds", "Time spent executing SQL while serving a request",
+                    DB_TIME_BUCKETS, ("method", "route"))
+n_plus_one = Counter("chatr_n_plus_one_requests_total",
+                     "Requests that ran one statement at least N_PLUS_ONE_THRESHOLD times", ("method", "route"))
+
+
+class RequestStats:
+    """ Database work done on behalf of the request being served """
+
+    __slots__ = ("scope", "queries", "db_time", "pool_wait", "statements")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.statements = {}
+
+
+current_request = ContextVar("current_request", default=None)
+_in_flight = {}
+_reported_n_plus_one = set()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_time += time.perf_counter() - context._metrics_started
+    stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+def record_pool_wait(waited: float) -> None:
+    stats = current_request.get()
+    if stats is not None:
+        stats.pool_wait += waited
+
+def instrument_engine(engine) -> None:
+    """ Attribute an engine's statements to the request that issued them """
+    if not settings.metrics_enabled:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_template(scope) -> str:
+    """ The matched route's path template, so ids don't explode label cardinality """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def current_route() -> str:
+    """ "GET /api/posts" for the request being served, None outside one or with metrics disabled """
+    stats = current_request.get()
+    if stats is None:
+        return None
+    return f"{stats.scope['method']} {_route_template(stats.scope)}"
+
+
+def _check_n_plus_one(method: str, route: str, stats: RequestStats) -> None:
+    statement, count = max(stats.statements.items(), key=lambda item: item[1])
+    if count < settings.n_plus_one_threshold:
+        return
+
+    n_plus_one.inc((method, route))
+    key = (method, route, statement)
+    if key not in _reported_n_plus_one:
+        # log each offender once, the counter keeps track after that
+        _reported_n_plus_one.add(key)
+        logger.warning(f"Possible N+1 on {method} {route}: statement ran {count} times in one request: "
+                       f"{' '.join(statement.split())[:300]}")
+
+
+class MetricsMiddleware:
+    """ ASGI middleware recording latency, status, in-flight count and DB work per route template """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        # the router fills in scope["route"] once it matches, so in-flight requests
+        # are grouped by route at scrape time instead of matching twice per request
+        key = id(scope)
+        _in_flight[key] = scope
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            del _in_flight[key]
+
+            method, route = scope["method"], _route_template(scope)
+            labels = (method, route)
+            http_requests.inc((method, route, status))
+            http_latency.observe(labels, elapsed)
+            db_queries.observe(labels, stats.queries)
+            db_time.observe(labels, stats.db_time)
+            pool_wait.observe(labels, stats.pool_wait)
+            if stats.statements:
+                _check_n_plus_one(method, route, stats)
+
+
+def _in_flight_lines() -> list:
+    counts = {}
+    for scope in list(_in_flight.values()):
+        labels = (scope["method"], _route_template(scope))
+        counts[labels] = counts.get(labels, 0) + 1
+    return sample_lines("chatr_http_requests_in_flight", "Requests being served right now", "gauge",
+                        sorted(counts.items()), ("method", "route"))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in registry:
+        lines += metric.render()
+    for collect in [_in_flight_lines] + collectors:
+        lines += collect()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,35 @@
+from app.cache import ResponseCache
+from app.config import get_settings
+
+settings = get_settings()
+
+# Serialized GET /posts and GET /posts/{post_id} bodies, identical for every anonymous caller.
+# Writes in this process invalidate exactly the entries they touch; the TTL bounds how long
+# writes made by other workers can go unseen.
+post_response_cache = ResponseCache(settings.response_cache_size, settings.response_cache_ttl_seconds)
+
+
+def feed_key(skip: int, limit: int, cursor):
+    return ("feed", skip, limit, cursor)
+
+def post_key(post_id: str):
+    return ("post", post_id)
+
+def _is_offset_page(key) -> bool:
+    # cursor pages only hold posts older than their cursor, so new posts never land in them
+    return key[0] == "feed" and key[3] is None
+
+def post_changed(post_id: str) -> None:
+    """a post's text, like count or comment count changed"""
+    post_response_cache.invalidate(ids=[post_id])
+
+def post_created(post_id: str) -> None:
+    """a new post goes on top of the feed, shifting every offset-based page"""
+    post_response_cache.invalidate(predicate=_is_offset_page)
+
+def post_deleted(post_id: str) -> None:
+    post_response_cache.invalidate(ids=[post_id], predicate=_is_offset_page)
+
+def posts_deleted(post_ids) -> None:
+    """many posts went at once, e.g. with their author's account"""
+    post_response_cache.invalidate(ids=post_ids, predicate=_is_offset_page)
@@ -1,19 +1,32 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, Index, func
+from sqlalchemy.orm import relationship, backref
 import uuid
-from app.database.main import Base
+from app.database.main import Base, Timestamp
 
 
 class Post(Base):
     __tablename__ = 'Posts'
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     text = Column(String(1000), nullable=True)
-    user_id = Column(String(36), ForeignKey("Users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    user_id = Column(String(36), ForeignKey("Users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(Timestamp, server_default=func.now())
 
-    user = relationship("User", backref="posts")
-    likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
+    # Denormalized counters, kept in step by LikeService and CommentService
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # children go with ON DELETE CASCADE in the database, so the ORM never loads them to delete
+    user = relationship("User", backref=backref("posts", passive_deletes=True))
+    likes = relationship("Like", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+
+    # Match the keyset pagination order of the feed and per-user post lists
+    __table_args__ = (
+        Index('ix_posts_created_at_id', 'created_at', 'id'),
+        Index('ix_posts_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+    # read created_at back with the INSERT, so a new post can be fanned out before it is committed
+    __mapper_args__ = {"eager_defaults": True}
 
     def to_dict(self):
         return {
@@ -21,10 +34,18 @@ class Post(Base):
             "text": self.text,
             "user_id": self.user_id,
             "username": self.user.username,
-            "created_at": self.created_at.isoformat(),
-            "like_count": len(self.likes),
-            "comment_count": len(self.comments)
+            "created_at": self.created_at,
+            "like_count": self.like_count,
+            "comment_count": self.comment_count
         }
     
     def __repr__(self):
-        return f"<Post(id={self.id}, text={self.text}, user_id={self.user_id})>"
\ No newline at end of file
+        return f"<Post(id={self.id}, text={self.text}, user_id={self.user_id})>"
+
+
+class TrendingScore(Base):
+    """ Saved state of the trending ranking, so a restart picks up where it left off """
+    __tablename__ = 'TrendingScores'
+    post_id = Column(String(36), ForeignKey("Posts.id", ondelete="CASCADE"), primary_key=True)
+    # log2 of the post's time-weighted activity; see app.posts.trending
+    score = Column(Float, nullable=False)
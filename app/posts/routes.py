@@ -1,58 +1,160 @@
-from fastapi import APIRouter, HTTPException,Depends, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException,Depends, status, Response, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app.users.models import User
-from app.posts.schema import PostPublic,PostCreate,PostBase
-from app.auth.service import get_user_details
-from app.database.main import get_db_session
-from app.posts.service import PostService
+from app.posts.schema import PostPublic,PostCreate,PostBase,PostBatchRequest,PostBatchItem,PostBatchResponse
+from app.auth.service import get_current_principal, get_optional_principal
+from app.auth.schema import CurrentUser
+from app.database.main import get_async_db_session
+from app.database.pagination import next_cursor_headers, set_next_cursor
+from app.posts.service import AsyncPostService
+from app.likes.service import AsyncLikeService
+from app.posts.cache import post_response_cache, feed_key, post_key
+from app.cache import CachedResponse
+from app.config import get_settings
+from app.serialization import render_list, list_response, loads, dumps
 from datetime import datetime
 
 
 router = APIRouter()
+settings = get_settings()
+
+
+def cached_json(cached : CachedResponse) -> Response:
+    return Response(content=cached.body, media_type="application/json", headers=cached.headers)
 
 
 @router.post("/posts",response_model=PostPublic,status_code=status.HTTP_201_CREATED)
-async def create_post(post_data : PostCreate, db : Session = Depends(get_db_session),
-                      current_user: User = Depends(get_user_details)):
+async def create_post(post_data : PostCreate, db : AsyncSession = Depends(get_async_db_session),
+                      current_user: CurrentUser = Depends(get_current_principal)):
     
-    post_service = PostService(db)
-    db_post = post_service.create_post(post_data, current_user.id)
+    post_service = AsyncPostService(db)
+    db_post = await post_service.create_post(post_data, current_user.id)
     return PostPublic(**db_post.to_dict())
 
 @router.get("/posts",response_model = List[PostPublic])
-async def get_all_posts(skip : int = 0, limit : int = 50, 
-                        db : Session = Depends(get_db_session)):
-
-    post_service = PostService(db)
-    posts = post_service.get_all_posts(skip, limit)
-    return [PostPublic(**post.to_dict()) for post in posts]
+async def get_all_posts(skip : int = 0, limit : int = 50, cursor : Optional[str] = None,
+                        db : AsyncSession = Depends(get_async_db_session),
+                        viewer : Optional[CurrentUser] = Depends(get_optional_principal)):
+
+    key = feed_key(skip, limit, cursor)
+    cached = post_response_cache.get(key)
+
+    if cached is None:
+        generation = post_response_cache.generation
+        post_service = AsyncPostService(db)
+        posts = await post_service.get_feed_rows(skip, limit, cursor)
+
+        rows = [post._asdict() for post in posts]
+        if settings.fast_responses:
+            body = render_list(PostPublic, rows)
+        else:
+            body = JSONResponse(jsonable_encoder([PostPublic(**row) for row in rows])).body
+
+        cached = CachedResponse(body, next_cursor_headers(posts, limit), [post.id for post in posts])
+        post_response_cache.set(key, cached, generation)
+
+    if viewer is None:
+        return cached_json(cached)
+
+    # the cached page is shared by everyone; only the viewer's flags are looked up per request
+    items = loads(cached.body)
+    like_service = AsyncLikeService(db)
+    liked = await like_service.get_liked_post_ids(viewer.id, [item["id"] for item in items])
+    for item in items:
+        item["liked_by_me"] = item["id"] in liked
+    return Response(content=dumps(items), media_type="application/json", headers=cached.headers)
+
+
+@router.get("/posts/home",response_model=List[PostPublic])
+async def get_home_timeline(response : Response, limit : int = 50, cursor : Optional[str] = None,
+                            db : AsyncSession = Depends(get_async_db_session),
+                            current_user : CurrentUser = Depends(get_current_principal)):
+    """The current user's posts and those of the accounts they follow, newest first"""
+    post_service = AsyncPostService(db)
+    posts = await post_service.get_home_rows(current_user.id, limit, cursor)
+    rows = [post._asdict() for post in posts]
+
+    like_service = AsyncLikeService(db)
+    liked = await like_service.get_liked_post_ids(current_user.id, [post.id for post in posts])
+    for row in rows:
+        row["liked_by_me"] = row["id"] in liked
+
+    if settings.fast_responses:
+        return list_response(PostPublic, rows, next_cursor_headers(posts, limit))
+
+    set_next_cursor(response, posts, limit)
+    return [PostPublic(**row) for row in rows]
+
+
+@router.get("/posts/trending",response_model=List[PostPublic])
+async def get_trending_posts(limit : int = Query(20, ge=1, le=settings.trending_size),
+                             db : AsyncSession = Depends(get_async_db_session),
+                             viewer : Optional[CurrentUser] = Depends(get_optional_principal)):
+    """The posts with the most likes and comments lately, best first"""
+    post_service = AsyncPostService(db)
+    posts = await post_service.get_trending_rows(limit)
+    rows = [post._asdict() for post in posts]
+
+    if viewer is not None:
+        like_service = AsyncLikeService(db)
+        liked = await like_service.get_liked_post_ids(viewer.id, [post.id for post in posts])
+        for row in rows:
+            row["liked_by_me"] = row["id"] in liked
+
+    if settings.fast_responses:
+        return list_response(PostPublic, rows)
+    return [PostPublic(**row) for row in rows]
+
+
+@router.post("/posts/batch",response_model=PostBatchResponse)
+async def get_posts_batch(batch : PostBatchRequest, db : AsyncSession = Depends(get_async_db_session)):
+    """Fetch many posts by ID in one query, with a result per requested ID"""
+    post_service = AsyncPostService(db)
+    posts = await post_service.get_posts_by_ids(batch.ids)
+
+    return PostBatchResponse(results=[
+        PostBatchItem(id=post_id, post=PostPublic(**posts[post_id].to_dict()))
+        if post_id in posts else PostBatchItem(id=post_id, error="Post not found")
+        for post_id in batch.ids
+    ])
 
 
 @router.get("/posts/{post_id}",response_model=PostPublic)
-async def get_post(post_id : str ,db : Session = Depends(get_db_session)):
+async def get_post(post_id : str ,db : AsyncSession = Depends(get_async_db_session)):
 
-    post_service = PostService(db)
-    post = post_service.get_post_by_id(post_id)
+    key = post_key(post_id)
+    cached = post_response_cache.get(key)
+    if cached is not None:
+        return cached_json(cached)
+
+    generation = post_response_cache.generation
+    post_service = AsyncPostService(db)
+    post = await post_service.get_post_by_id(post_id)
 
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    return PostPublic(**post.to_dict())
+
+    response = JSONResponse(jsonable_encoder(PostPublic(**post.to_dict())))
+    post_response_cache.set(key, CachedResponse(response.body, {}, [post.id]), generation)
+    return response
 
 
 
 @router.put("/posts/{post_id}",response_model=PostPublic)
-async def update_post(post_data : PostBase , post_id : str , db : Session = Depends(get_db_session),
-                      current_user : User = Depends(get_user_details)):
+async def update_post(post_data : PostBase , post_id : str , db : AsyncSession = Depends(get_async_db_session),
+                      current_user : CurrentUser = Depends(get_current_principal)):
 
-    post_service = PostService(db)
-    post = post_service.update_post(post_id, post_data, current_user.id)
+    post_service = AsyncPostService(db)
+    post = await post_service.update_post(post_id, post_data, current_user.id)
     return PostPublic(**post.to_dict())
 
 @router.delete("/posts/{post_id}",status_code=status.HTTP_204_NO_CONTENT)
-async def delete_post(post_id : str, db  : Session = Depends(get_db_session),
-                      current_user : User = Depends(get_user_details)):
+async def delete_post(post_id : str, db  : AsyncSession = Depends(get_async_db_session),
+                      current_user : CurrentUser = Depends(get_current_principal)):
 
-    post_service = PostService(db)
-    post_service.delete_post(post_id, current_user.id)
+    post_service = AsyncPostService(db)
+    await post_service.delete_post(post_id, current_user.id)
     return None
\ No newline at end of file
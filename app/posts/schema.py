@@ -1,5 +1,8 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+from typing import List, Optional
+
+MAX_BATCH_SIZE = 100
 
 class PostBase(BaseModel):
     text: str
@@ -14,6 +17,18 @@ class PostPublic(PostBase):
     created_at: datetime
     like_count: int
     comment_count: int
+    liked_by_me: Optional[bool] = None  # only set when the request carries a bearer token
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PostBatchRequest(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+class PostBatchItem(BaseModel):
+    id: str
+    post: Optional[PostPublic] = None
+    error: Optional[str] = None
+
+class PostBatchResponse(BaseModel):
+    results: List[PostBatchItem]
@@ -1,5 +1,7 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, delete, union, Row
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status,Depends
 from fastapi.security import HTTPAuthorizationCredentials,HTTPBearer
 from jose import jwt, JWTError
@@ -7,58 +9,184 @@ from app.posts.models import Post
 from app.users.models import User
 from app.comments.models import Comment
 from app.likes.models import Like
+from app.follows.models import TimelineEntry
+from app.follows.service import FollowService, AsyncFollowService
 from app.posts.schema import PostCreate, PostBase
 
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Dict
+from app.database.pagination import paginate
+from app.posts.cache import post_changed, post_created, post_deleted
+from app.posts.trending import trending_posts, trending_restored
+from app.live.hub import live_hub
+
+
+def feed_rows_query(user_id: Optional[str] = None):
+    """Exactly the columns PostPublic needs, read as plain rows: no identity map or relationship loading"""
+    query = select(
+        Post.id, Post.text, Post.user_id, User.username,
+        Post.created_at, Post.like_count, Post.comment_count
+    ).join(User, Post.user_id == User.id)
+
+    if user_id is not None:
+        query = query.filter(Post.user_id == user_id)
+    return query
+
+
+def home_timeline_query(user_id: str, merged_accounts: List[str], cursor: Optional[str], limit: int):
+    """A page of someone's home timeline: one range scan of their entries, plus a short one per merged account"""
+    fanned_out = select(TimelineEntry.post_id.label("id"), TimelineEntry.created_at).where(
+        TimelineEntry.user_id == user_id
+    )
+    if not merged_accounts:
+        page = paginate(fanned_out, TimelineEntry.created_at, TimelineEntry.post_id, cursor, 0, limit).subquery()
+    else:
+        # accounts too big to fan out: their newest posts are read from Posts and merged in
+        branches = [paginate(fanned_out, TimelineEntry.created_at, TimelineEntry.post_id, cursor, 0, limit)]
+        branches += [
+            paginate(select(Post.id, Post.created_at).where(Post.user_id == account_id),
+                     Post.created_at, Post.id, cursor, 0, limit)
+            for account_id in merged_accounts
+        ]
+        page = union(*(select(branch.subquery()) for branch in branches)).subquery()
+
+    query = feed_rows_query().join(page, page.c.id == Post.id)
+    return query.order_by(page.c.created_at.desc(), page.c.id.desc()).limit(limit)
+
+
+def in_trending_order(rows, post_ids: List[str]) -> List[Row]:
+    """Rows back in ranking order; posts deleted since they were ranked are dropped from the ranking"""
+    by_id = {row.id: row for row in rows}
+    missing = [post_id for post_id in post_ids if post_id not in by_id]
+    if missing:
+        trending_posts.discard(missing)
+    return [by_id[post_id] for post_id in post_ids if post_id in by_id]
 
 
 class PostService:
+    """Sync reads, as checked by check_query_plans; the routes write through AsyncPostService"""
+
     def __init__(self, db: Session):
         self.db = db
 
+    def get_all_posts(self, skip: int = 0, limit: int = 50, cursor: Optional[str] = None) -> List[Post]:
+        """Get all posts with pagination"""
+        query = self.db.query(Post).join(User).options(
+            contains_eager(Post.user)
+        )
+        return paginate(query, Post.created_at, Post.id, cursor, skip, limit).all()
+
+    def get_feed_rows(self, skip: int = 0, limit: int = 50, cursor: Optional[str] = None,
+                      user_id: Optional[str] = None) -> List[Row]:
+        """Read-only page of posts as row tuples, optionally for one user"""
+        query = paginate(feed_rows_query(user_id), Post.created_at, Post.id, cursor, skip, limit)
+        return self.db.execute(query).all()
+
+    def get_home_rows(self, user_id: str, limit: int = 50, cursor: Optional[str] = None) -> List[Row]:
+        """Page of the user's home timeline as row tuples: their own posts and those of accounts they follow"""
+        merged_accounts = FollowService(self.db).get_merged_accounts(user_id)
+        return self.db.execute(home_timeline_query(user_id, merged_accounts, cursor, limit)).all()
+
+    def get_post_by_id(self, post_id: str) -> Post:
+        """Get post by ID"""
+        return self.db.query(Post).options(
+            joinedload(Post.user)
+        ).filter(Post.id == post_id).order_by(Post.created_at.desc()).first()
+
+    def get_posts_by_ids(self, post_ids: List[str]) -> Dict[str, Post]:
+        """Get many posts in one query, keyed by ID"""
+        posts = self.db.query(Post).options(
+            joinedload(Post.user)
+        ).filter(Post.id.in_(set(post_ids))).all()
+        return {post.id: post for post in posts}
+
+    def get_user_posts(self, user_id: str, skip: int = 0, limit: int = 10, cursor: Optional[str] = None) -> List[Post]:
+        """Get posts by user ID with pagination"""
+        query = self.db.query(Post).options(
+            joinedload(Post.user)
+        ).filter(Post.user_id == user_id)
+        return paginate(query, Post.created_at, Post.id, cursor, skip, limit).all()
+
+
+class AsyncPostService:
+    """Async counterpart of PostService used by the API routes"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
     def validate_post_content(self, text: str) -> None:
         """Validate post content"""
         if not text.strip():
             raise HTTPException(status_code=400, detail="Posts cannot be empty")
 
-    def create_post(self, post_data: PostCreate, user_id: str) -> Post:
+    async def create_post(self, post_data: PostCreate, user_id: str) -> Post:
         """Create a new post"""
         self.validate_post_content(post_data.text)
-        
+
         db_post = Post(
             text=post_data.text,
             user_id=user_id
         )
         self.db.add(db_post)
-        self.db.commit()
-        self.db.refresh(db_post)
-        return db_post
+        try:
+            await self.db.flush()
+            await AsyncFollowService(self.db).fan_out(db_post)
+            await self.db.commit()
+        except IntegrityError:
+            # the foreign key rejects posts by an account deleted since its token was issued
+            await self.db.rollback()
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        post_created(db_post.id)
 
-    def get_all_posts(self, skip: int = 0, limit: int = 50) -> List[Post]:
-        """Get all posts with pagination"""
-        return self.db.query(Post).join(User).options(
-            joinedload(Post.likes),
-            joinedload(Post.comments)
-        ).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
+        post = await self.get_post_by_id(db_post.id)
+        live_hub.publish("post_created", post.to_dict())
+        return post
 
-    def get_post_by_id(self, post_id: str) -> Post:
+    async def get_feed_rows(self, skip: int = 0, limit: int = 50, cursor: Optional[str] = None,
+                            user_id: Optional[str] = None) -> List[Row]:
+        """Read-only page of posts as row tuples, optionally for one user"""
+        result = await self.db.execute(
+            paginate(feed_rows_query(user_id), Post.created_at, Post.id, cursor, skip, limit)
+        )
+        return result.all()
+
+    async def get_home_rows(self, user_id: str, limit: int = 50, cursor: Optional[str] = None) -> List[Row]:
+        """Page of the user's home timeline as row tuples: their own posts and those of accounts they follow"""
+        merged_accounts = await AsyncFollowService(self.db).get_merged_accounts(user_id)
+        result = await self.db.execute(home_timeline_query(user_id, merged_accounts, cursor, limit))
+        return result.all()
+
+    async def get_trending_rows(self, limit: int = 20) -> List[Row]:
+        """The most liked and commented posts of late as row tuples, best first"""
+        await trending_restored()
+        post_ids = trending_posts.top(limit)
+        if not post_ids:
+            return []
+        result = await self.db.execute(feed_rows_query().filter(Post.id.in_(post_ids)))
+        return in_trending_order(result.all(), post_ids)
+
+    async def get_post_by_id(self, post_id: str) -> Post:
         """Get post by ID"""
-        return self.db.query(Post).options(
-            joinedload(Post.likes),
-            joinedload(Post.comments)
-        ).filter(Post.id == post_id).order_by(Post.created_at.desc()).first()
+        result = await self.db.execute(
+            select(Post).options(
+                joinedload(Post.user)
+            ).filter(Post.id == post_id).execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
 
-    def get_user_posts(self, user_id: str, skip: int = 0, limit: int = 10) -> List[Post]:
-        """Get posts by user ID with pagination"""
-        return self.db.query(Post).options(
-            joinedload(Post.likes),
-            joinedload(Post.comments)
-        ).filter(Post.user_id == user_id).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
+    async def get_posts_by_ids(self, post_ids: List[str]) -> Dict[str, Post]:
+        """Get many posts in one query, keyed by ID"""
+        result = await self.db.execute(
+            select(Post).options(
+                joinedload(Post.user)
+            ).filter(Post.id.in_(set(post_ids)))
+        )
+        return {post.id: post for post in result.scalars().all()}
 
-    def update_post(self, post_id: str, post_data: PostBase, current_user_id: str) -> Post:
+    async def update_post(self, post_id: str, post_data: PostBase, current_user_id: str) -> Post:
         """Update a post"""
-        post = self.db.query(Post).filter(Post.id == post_id).first()
+        result = await self.db.execute(select(Post).filter(Post.id == post_id))
+        post = result.scalars().first()
         if not post:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found.")
 
@@ -66,30 +194,20 @@ class PostService:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only update your own post.")
 
         post.text = post_data.text
-        self.db.commit()
-        self.db.refresh(post)
-        return post
+        await self.db.commit()
+        post_changed(post_id)
+        return await self.get_post_by_id(post_id)
 
-    def delete_post(self, post_id: str, current_user_id: str) -> None:
-        """Delete a post"""
-        post = self.db.query(Post).filter(Post.id == post_id).first()
+    async def delete_post(self, post_id: str, current_user_id: str) -> None:
+        """Delete a post; its likes and comments go with it through ON DELETE CASCADE"""
+        result = await self.db.execute(delete(Post).where(Post.id == post_id, Post.user_id == current_user_id))
 
-        if not post:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found.")
-
-        if post.user_id != current_user_id:
+        if result.rowcount == 0:
+            # nothing deleted: tell a missing post from someone else's
+            exists = await self.db.execute(select(Post.id).filter(Post.id == post_id))
+            if exists.first() is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found.")
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You can only delete your own post.")
 
-        # Delete related likes first
-        likes = self.db.query(Like).filter(Like.post_id == post_id).all()
-        for like in likes:
-            self.db.delete(like)
-        
-        # Delete related comments first
-        comments = self.db.query(Comment).filter(Comment.post_id == post_id).all()
-        for comment in comments:
-            self.db.delete(comment)
-        
-        # Now delete the post
-        self.db.delete(post)
-        self.db.commit()
\ No newline at end of file
+        await self.db.commit()
+        post_deleted(post_id)
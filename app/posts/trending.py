@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import logging
+import math
+import threading
+import time
+from operator import itemgetter
+from sqlalchemy import delete, insert, select
+from app.config import get_settings
+from app.database.main import get_async_sessionmaker
+from app.posts.models import Post, TrendingScore
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+# posts followed per place in the top K, so a rising post can build up a score before it ranks
+CANDIDATES_PER_SLOT = 4
+
+
+def _log2_add(a: float, b: float) -> float:
+    """ log2(2**a + 2**b) without leaving log space """
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+def _log2_subtract(a: float, b: float):
+    """ log2(2**a - 2**b), or None once nothing is left """
+    if b >= a:
+        return None
+    return a + math.log2(1 - 2 ** (b - a))
+
+
+class TrendingPosts:
+    """ Time-decayed like and comment activity of the hottest posts, per process.
+
+    An event adds its weight times 2 ** (t / half_life) and a post's score is log2 of the sum.
+    Counting later events for more is the same as decaying earlier ones, except that stored
+    scores never change as time passes: two posts only swap places when one of them gets an
+    event, so the top K is re-sorted after writes and never on a timer.
+    """
+
+    def __init__(self, half_life_seconds: float, size: int):
+        self.half_life = half_life_seconds
+        self.size = size
+        self.capacity = size * CANDIDATES_PER_SLOT
+        self._scores = {}  # post_id -> log2 score
+        self._top = []     # the size best post ids, None after a change
+        self._lock = threading.Lock()
+        self.version = 0   # bumped on every change, so an unchanged ranking isn't saved again
+
+    def record(self, post_id: str, weight: float, at: float = None) -> None:
+        """ Count an event for post_id; a negative weight takes one back as if it happened now """
+        event = (time.time() if at is None else at) / self.half_life + math.log2(abs(weight))
+        with self._lock:
+            score = self._scores.get(post_id)
+            if weight > 0:
+                self._scores[post_id] = event if score is None else _log2_add(score, event)
+            elif score is not None:
+                score = _log2_subtract(score, event)
+                if score is None:
+                    del self._scores[post_id]
+                else:
+                    self._scores[post_id] = score
+            else:
+                return
+
+            if len(self._scores) > 2 * self.capacity:
+                self._scores = dict(heapq.nlargest(self.capacity, self._scores.items(), key=itemgetter(1)))
+            self._top = None
+            self.version += 1
+
+    def top(self, limit: int) -> list:
+        """ The limit best post ids, best first """
+        with self._lock:
+            if self._top is None:
+                best = heapq.nlargest(self.size, self._scores.items(), key=itemgetter(1))
+                self._top = [post_id for post_id, _ in best]
+            return self._top[:limit]
+
+    def discard(self, post_ids) -> None:
+        with self._lock:
+            for post_id in post_ids:
+                self._scores.pop(post_id, None)
+            self._top = None
+            self.version += 1
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return list(self._scores.items())
+
+    def load(self, scores) -> None:
+        """ Add saved (post_id, score) pairs to whatever was recorded since startup """
+        with self._lock:
+            for post_id, score in scores:
+                current = self._scores.get(post_id)
+                self._scores[post_id] = score if current is None else _log2_add(current, score)
+            self._top = None
+
+    def __len__(self):
+        return len(self._scores)
+
+
+trending_posts = TrendingPosts(settings.trending_half_life_hours * 3600, settings.trending_size)
+
+
+def post_liked(post_id: str) -> None:
+    trending_posts.record(post_id, LIKE_WEIGHT)
+
+def post_unliked(post_id: str) -> None:
+    trending_posts.record(post_id, -LIKE_WEIGHT)
+
+def post_commented(post_id: str) -> None:
+    trending_posts.record(post_id, COMMENT_WEIGHT)
+
+
+# version of the ranking last saved or restored; None until the restore, so a process
+# shutting down before it has loaded the saved ranking doesn't overwrite it
+_saved_version = None
+
+async def restore_trending() -> int:
+    """ Rebuild the ranking from the last save; returns the posts loaded """
+    global _saved_version
+    async with get_async_sessionmaker()() as db:
+        result = await db.execute(select(TrendingScore.post_id, TrendingScore.score))
+        scores = result.all()
+    trending_posts.load(scores)
+    # loading doesn't bump the version: anything recorded before it is still unsaved
+    _saved_version = 0
+    return len(scores)
+
+async def save_trending() -> None:
+    """ Replace the saved ranking with this process's, if it changed since the last save """
+    global _saved_version
+    version = trending_posts.version
+    if _saved_version is None:
+        if version == 0:
+            # nothing to add to the saved ranking, so don't connect just to load it
+            return
+        await trending_restored()
+        if _saved_version is None:
+            return
+    if version == _saved_version:
+        return
+
+    scores = dict(trending_posts.snapshot())
+    async with get_async_sessionmaker()() as db:
+        # deleted posts can't be saved; forget them here too
+        result = await db.execute(select(Post.id).where(Post.id.in_(list(scores))))
+        existing = set(result.scalars().all())
+        trending_posts.discard(set(scores) - existing)
+
+        await db.execute(delete(TrendingScore))
+        if existing:
+            await db.execute(insert(TrendingScore), [{"post_id": post_id, "score": scores[post_id]}
+                                                     for post_id in existing])
+        await db.commit()
+    _saved_version = version
+
+async def _restore_in_background() -> None:
+    try:
+        restored = await restore_trending()
+        logger.info(f"Restored {restored} trending posts.")
+    except Exception as e:
+        logger.error(f"Error restoring trending posts: {str(e)}")
+
+_restoring = None
+
+async def trending_restored() -> None:
+    """ Load the saved ranking on first use rather than at startup, once per process """
+    global _restoring
+    if _restoring is None:
+        _restoring = asyncio.create_task(_restore_in_background())
+    if not _restoring.done():
+        # shielded: a cancelled request mustn't cancel the restore
+        await asyncio.shield(_restoring)
+
+async def save_trending_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.trending_save_seconds)
+        try:
+            await save_trending()
+        except Exception as e:
+            logger.warning(f"Could not save trending posts: {str(e)}")
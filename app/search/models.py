@@ -0,0 +1,58 @@
+from sqlalchemy import DDL, event
+from app.posts.models import Post
+from app.comments.models import Comment
+
+# Words are indexed unstemmed on both databases, so a prefix of what was typed matches the
+# same rows everywhere. Posts and comments share one FTS5 index; its rowids come from the
+# INTEGER PRIMARY KEY of SearchDocuments, which VACUUM keeps stable, unlike the implicit
+# rowids of the string-keyed tables. Two and three letter prefixes get their own index, so
+# the first letters of a word don't expand into every term that starts with them
+SQLITE_SEARCH_TABLES = [
+    'CREATE TABLE IF NOT EXISTS "SearchDocuments" ('
+    ' rowid INTEGER PRIMARY KEY, kind VARCHAR(7) NOT NULL,'
+    ' item_id VARCHAR(36) NOT NULL UNIQUE, post_id VARCHAR(36) NOT NULL)',
+    'CREATE VIRTUAL TABLE IF NOT EXISTS "SearchIndex" USING fts5(text, tokenize = \'unicode61\', prefix = \'2 3\')',
+]
+
+
+def sqlite_search_triggers(table: str, kind: str, post_id: str) -> list:
+    """ Keep the index in step with every insert, text edit and delete, cascades included """
+    name = table.lower()
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS search_{name}_insert AFTER INSERT ON "{table}" BEGIN'
+        f' INSERT INTO "SearchDocuments" (kind, item_id, post_id) VALUES (\'{kind}\', new.id, new.{post_id});'
+        f' INSERT INTO "SearchIndex" (rowid, text) VALUES (last_insert_rowid(), coalesce(new.text, \'\'));'
+        f' END',
+        f'CREATE TRIGGER IF NOT EXISTS search_{name}_update AFTER UPDATE OF text ON "{table}" BEGIN'
+        f' UPDATE "SearchIndex" SET text = coalesce(new.text, \'\')'
+        f' WHERE rowid = (SELECT rowid FROM "SearchDocuments" WHERE item_id = new.id);'
+        f' END',
+        f'CREATE TRIGGER IF NOT EXISTS search_{name}_delete AFTER DELETE ON "{table}" BEGIN'
+        f' DELETE FROM "SearchIndex" WHERE rowid = (SELECT rowid FROM "SearchDocuments" WHERE item_id = old.id);'
+        f' DELETE FROM "SearchDocuments" WHERE item_id = old.id;'
+        f' END',
+    ]
+
+
+def postgres_search_column(table: str) -> list:
+    """ Postgres keeps a generated column in step by itself, no triggers needed """
+    return [
+        f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS search_vector tsvector'
+        f' GENERATED ALWAYS AS (to_tsvector(\'simple\', coalesce(text, \'\'))) STORED',
+        f'CREATE INDEX IF NOT EXISTS ix_{table.lower()}_search_vector ON "{table}" USING gin (search_vector)',
+    ]
+
+
+def _on_create(table, dialect: str, statements: list) -> None:
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect=dialect))
+
+
+# create_all builds the index with the tables; existing databases get it from the migration
+_on_create(Post.__table__, "sqlite", SQLITE_SEARCH_TABLES + sqlite_search_triggers("Posts", "post", "id"))
+_on_create(Comment.__table__, "sqlite", sqlite_search_triggers("Comments", "comment", "post_id"))
+_on_create(Post.__table__, "postgresql", postgres_search_column("Posts"))
+_on_create(Comment.__table__, "postgresql", postgres_search_column("Comments"))
+
+for statement in ('DROP TABLE IF EXISTS "SearchIndex"', 'DROP TABLE IF EXISTS "SearchDocuments"'):
+    event.listen(Post.__table__, "after_drop", DDL(statement).execute_if(dialect="sqlite"))
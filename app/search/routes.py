@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from app.database.main import get_async_db_session
+from app.database.pagination import NEXT_CURSOR_HEADER
+from app.search.schema import SearchResult
+from app.search.service import AsyncSearchService, next_search_cursor
+
+
+router = APIRouter()
+
+@router.get("/search", response_model=List[SearchResult])
+async def search(response: Response, q: str = Query(min_length=1, max_length=200),
+                 type: Optional[Literal["post", "comment"]] = None, limit: int = Query(20, ge=1, le=100),
+                 cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db_session)):
+    """Posts and comments matching every word of q, most relevant first"""
+    search_service = AsyncSearchService(db)
+    rows = await search_service.search(q, type, limit, cursor)
+
+    next_cursor = next_search_cursor(rows, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [row._asdict() for row in rows]
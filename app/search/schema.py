@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Literal, Optional
+
+
+class SearchResult(BaseModel):
+    kind: Literal["post", "comment"]
+    id: str
+    post_id: str  # the post itself, or the post a comment belongs to
+    text: Optional[str]
+    user_id: str
+    username: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,125 @@
+import re
+from sqlalchemy import Float, String, text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from app.database.main import Timestamp
+from app.database.pagination import decode_score_cursor, encode_score_cursor
+import app.search.models  # registers the index DDL with create_all
+
+MAX_TERMS = 8
+# only the newest matches are ranked, which bounds the work for words found in half the posts
+MAX_CANDIDATES = 1000
+KINDS = ("post", "comment")
+
+# columns of a search row; score sorts ascending, best match first
+RESULT_COLUMNS = {"kind": String, "id": String, "post_id": String, "text": String, "user_id": String,
+                  "username": String, "created_at": Timestamp, "score": Float}
+
+
+def search_terms(q: str) -> List[str]:
+    """ Words only, so nothing a user types reaches the query syntax of either database """
+    return re.findall(r"\w+", q.lower())[:MAX_TERMS]
+
+
+def sqlite_search(terms: List[str], kinds: Tuple[str, ...], after: Optional[Tuple[float, str]]):
+    # every term must match, the last one as a prefix so results follow the user's typing
+    params = {"match": " ".join(f'"{term}"' for term in terms) + "*", "candidates": MAX_CANDIDATES}
+    kind_filter = ""
+    if len(kinds) == 1:
+        kind_filter = ' AND (SELECT kind FROM "SearchDocuments" d WHERE d.rowid = "SearchIndex".rowid) = :kind'
+        params["kind"] = kinds[0]
+    keyset = ""
+    if after:
+        # ties are broken by rowid, the order the index hands out, found again from the cursor's id
+        keyset = (' WHERE score > :score OR (score = :score'
+                  ' AND rowid > (SELECT rowid FROM "SearchDocuments" WHERE item_id = :after_id))')
+        params.update(score=after[0], after_id=after[1])
+
+    # rowids follow insertion, so the newest matches come straight off the index and only the
+    # page that is returned is joined to its post or comment
+    return text(
+        'SELECT d.kind, d.item_id AS id, d.post_id, coalesce(p.text, c.text) AS text, u.id AS user_id,'
+        ' u.username, coalesce(p.created_at, c.created_at) AS created_at, r.score'
+        ' FROM (SELECT * FROM ('
+        '  SELECT rowid, bm25("SearchIndex") AS score FROM "SearchIndex"'
+        f'  WHERE "SearchIndex" MATCH :match{kind_filter} ORDER BY rowid DESC LIMIT :candidates)'
+        f'{keyset} ORDER BY score, rowid LIMIT :limit) r'
+        ' JOIN "SearchDocuments" d ON d.rowid = r.rowid'
+        ' LEFT JOIN "Posts" p ON d.kind = \'post\' AND p.id = d.item_id'
+        ' LEFT JOIN "Comments" c ON d.kind = \'comment\' AND c.id = d.item_id'
+        ' JOIN "Users" u ON u.id = coalesce(p.user_id, c.user_id)'
+        ' ORDER BY r.score, r.rowid'
+    ).bindparams(**params).columns(**RESULT_COLUMNS)
+
+
+def postgres_search(terms: List[str], kinds: Tuple[str, ...], after: Optional[Tuple[float, str]]):
+    branches = {
+        "post": '(SELECT \'post\' AS kind, id, id AS post_id, text, user_id, created_at, search_vector'
+                ' FROM "Posts" WHERE search_vector @@ to_tsquery(\'simple\', :query)'
+                ' ORDER BY created_at DESC LIMIT :candidates)',
+        "comment": '(SELECT \'comment\' AS kind, id, post_id, text, user_id, created_at, search_vector'
+                   ' FROM "Comments" WHERE search_vector @@ to_tsquery(\'simple\', :query)'
+                   ' ORDER BY created_at DESC LIMIT :candidates)',
+    }
+    params = {"query": " & ".join(terms) + ":*", "candidates": MAX_CANDIDATES}
+    keyset = ""
+    if after:
+        keyset = " WHERE score > :score OR (score = :score AND id > :after_id)"
+        params.update(score=after[0], after_id=after[1])
+
+    # ranked after the newest matches are picked, so ts_rank runs on no more than the candidates
+    return text(
+        'SELECT r.kind, r.id, r.post_id, r.text, r.user_id, u.username, r.created_at, r.score'
+        ' FROM (SELECT * FROM ('
+        '  SELECT kind, id, post_id, text, user_id, created_at,'
+        '  -ts_rank(search_vector, to_tsquery(\'simple\', :query)) AS score'
+        f'  FROM ({" UNION ALL ".join(branches[kind] for kind in kinds)}'
+        '   ORDER BY created_at DESC LIMIT :candidates) m) s'
+        f'{keyset} ORDER BY score, id LIMIT :limit) r'
+        ' JOIN "Users" u ON u.id = r.user_id'
+        ' ORDER BY r.score, r.id'
+    ).bindparams(**params).columns(**RESULT_COLUMNS)
+
+
+def search_query(dialect_name: str, q: str, kind: Optional[str], cursor: Optional[str], limit: int):
+    """ Ranked matches for q among its newest MAX_CANDIDATES, best first; None when q has no words to look for """
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    kinds = (kind,) if kind else KINDS
+    after = decode_score_cursor(cursor) if cursor else None
+    build = sqlite_search if dialect_name == "sqlite" else postgres_search
+    return build(terms, kinds, after).bindparams(limit=limit)
+
+
+def next_search_cursor(rows: list, limit: int) -> Optional[str]:
+    if not rows or len(rows) < limit:
+        return None
+    return encode_score_cursor(rows[-1].score, rows[-1].id)
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(self, q: str, kind: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None) -> list:
+        """Posts and comments matching q, most relevant first"""
+        query = search_query(self.db.get_bind().dialect.name, q, kind, cursor, limit)
+        if query is None:
+            return []
+        return self.db.execute(query).all()
+
+
+class AsyncSearchService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(self, q: str, kind: Optional[str] = None, limit: int = 20,
+                     cursor: Optional[str] = None) -> list:
+        """Posts and comments matching q, most relevant first"""
+        query = search_query(self.db.get_bind().dialect.name, q, kind, cursor, limit)
+        if query is None:
+            return []
+        return (await self.db.execute(query)).all()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime,Boolean, UniqueConstraint, Index, func
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime,Boolean, UniqueConstraint, Index, func
 from sqlalchemy.orm import relationship
 import uuid
 from app.database.main import Base
@@ -11,9 +11,12 @@ class User(Base):
     is_verified = Column(Boolean, default= False)
     hashed_password = Column(String(255), nullable=False)
 
+    # Denormalized counter, kept in step by FollowService; decides how new posts reach followers
+    follower_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     __table_args__ = (
         Index('ix_users_email_lower', func.lower(email), unique=True),
+        Index('ix_users_follower_count', 'follower_count'),
     )
 
     def to_dict(self):
@@ -1,28 +1,54 @@
-from fastapi import APIRouter, HTTPException,Depends, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException,Depends, status, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from app.users.models import User
-from app.users.schema import UserResponse
-from app.auth.service import get_user_details
-from app.database.main import get_db_session
-from app.users.service import UserService
-from app.posts.service import PostService
+from app.users.schema import UserResponse,UserBatchRequest,UserBatchItem,UserBatchResponse
+from app.auth.service import get_current_principal, get_optional_principal
+from app.auth.schema import CurrentUser
+from app.database.main import get_async_db_session
+from app.database.pagination import set_next_cursor, next_cursor_headers
+from app.config import get_settings
+from app.serialization import list_response
+from app.users.service import AsyncUserService
+from app.posts.service import AsyncPostService
+from app.likes.service import AsyncLikeService
 from app.posts.schema import PostPublic
 
 
 router = APIRouter()
+settings = get_settings()
 
 # User Routes
 @router.get("/profile")
-async def show_profile(current_user : User = Depends(get_user_details)):
+async def show_profile(current_user : CurrentUser = Depends(get_current_principal)):
     return {"user": UserResponse(**current_user.to_dict())}
 
+@router.delete("/profile", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_account(db: AsyncSession = Depends(get_async_db_session),
+                         current_user: CurrentUser = Depends(get_current_principal)):
+    """Delete the current user's account along with their posts, comments and likes"""
+    user_service = AsyncUserService(db)
+    await user_service.delete_user(current_user.id, current_user.email)
+    return None
+
+@router.post("/users/batch", response_model=UserBatchResponse)
+async def get_users_batch(batch: UserBatchRequest, db: AsyncSession = Depends(get_async_db_session)):
+    """Fetch many users by ID in one query, with a result per requested ID"""
+    user_service = AsyncUserService(db)
+    users = await user_service.get_users_by_ids(batch.ids)
+
+    return UserBatchResponse(results=[
+        UserBatchItem(id=user_id, user=UserResponse(**users[user_id].to_dict()))
+        if user_id in users else UserBatchItem(id=user_id, error="User not found")
+        for user_id in batch.ids
+    ])
+
 @router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user_by_id(user_id: str, db: Session = Depends(get_db_session)):
+async def get_user_by_id(user_id: str, db: AsyncSession = Depends(get_async_db_session)):
     """Get user details by user ID"""
 
-    user_service = UserService(db)
-    user = user_service.get_user_by_id(user_id)
+    user_service = AsyncUserService(db)
+    user = await user_service.get_user_by_id(user_id)
     
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -30,15 +56,28 @@ async def get_user_by_id(user_id: str, db: Session = Depends(get_db_session)):
     return UserResponse(**user.to_dict())
 
 @router.get("/users/{user_id}/posts",response_model=List[PostPublic])
-async def get_user_post(user_id : str ,skip :int = 0, limit :  int =10,
-                        db: Session = Depends(get_db_session)):
+async def get_user_post(user_id : str, response : Response, skip :int = 0, limit :  int =10, cursor : Optional[str] = None,
+                        db: AsyncSession = Depends(get_async_db_session),
+                        viewer: Optional[CurrentUser] = Depends(get_optional_principal)):
     
-    user_service = UserService(db)
-    post_service = PostService(db)
+    user_service = AsyncUserService(db)
+    post_service = AsyncPostService(db)
     
-    user = user_service.get_user_by_id(user_id)
+    user = await user_service.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not Found.")
 
-    posts = post_service.get_user_posts(user_id, skip, limit)
-    return [PostPublic(**post.to_dict()) for post in posts]
\ No newline at end of file
+    posts = await post_service.get_feed_rows(skip, limit, cursor, user_id=user_id)
+    rows = [post._asdict() for post in posts]
+
+    if viewer is not None:
+        like_service = AsyncLikeService(db)
+        liked = await like_service.get_liked_post_ids(viewer.id, [post.id for post in posts])
+        for row in rows:
+            row["liked_by_me"] = row["id"] in liked
+
+    if settings.fast_responses:
+        return list_response(PostPublic, rows, next_cursor_headers(posts, limit))
+
+    set_next_cursor(response, posts, limit)
+    return [PostPublic(**row) for row in rows]
\ No newline at end of file
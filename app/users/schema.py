@@ -1,5 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+from typing import List, Optional
+from app.posts.schema import MAX_BATCH_SIZE
 
 # User schema
 class UserBase(BaseModel):
@@ -17,4 +19,15 @@ class UserResponse(UserBase):
     id: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UserBatchRequest(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+class UserBatchItem(BaseModel):
+    id: str
+    user: Optional[UserResponse] = None
+    error: Optional[str] = None
+
+class UserBatchResponse(BaseModel):
+    results: List[UserBatchItem]
@@ -1,13 +1,47 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, update, delete
 from fastapi import HTTPException, status,Depends
 from fastapi.security import HTTPAuthorizationCredentials,HTTPBearer
 from jose import jwt, JWTError
 from app.users.models import User
+from app.posts.models import Post
+from app.comments.models import Comment
+from app.likes.models import Like
+from app.emails.models import EmailOutbox
+from app.follows.models import Follow
+from app.posts.cache import post_changed, posts_deleted
 from app.users.schema import UserCreate, UserLogin
-from app.auth.service import hash_password, verify_password
+from app.auth.service import hash_password, verify_password, hash_password_async, verify_password_async, password_needs_rehash, invalidate_cached_user, user_deleted
 from datetime import datetime
-from typing import List
+from typing import List, Dict
+
+
+def account_deletion(user_id: str, email: str):
+    """Statements that remove a user's footprint, in order; the ON DELETE CASCADE keys do the rest"""
+    comments_on_post = select(func.count()).select_from(Comment).where(
+        Comment.user_id == user_id, Comment.post_id == Post.id
+    ).scalar_subquery()
+
+    statements = (
+        # their likes and comments go by cascade, so first take them off other people's counters
+        update(Post).where(Post.id.in_(select(Like.post_id).where(Like.user_id == user_id)))
+        .values(like_count=Post.like_count - 1).returning(Post.id),
+        update(Post).where(Post.id.in_(select(Comment.post_id).where(Comment.user_id == user_id)))
+        .values(comment_count=Post.comment_count - comments_on_post).returning(Post.id),
+        update(User).where(User.id.in_(select(Follow.followee_id).where(Follow.follower_id == user_id)))
+        .values(follower_count=User.follower_count - 1),
+        delete(Post).where(Post.user_id == user_id).returning(Post.id),
+        delete(EmailOutbox).where(EmailOutbox.to_email == email),
+        delete(User).where(User.id == user_id),
+    )
+    return [statement.execution_options(synchronize_session=False) for statement in statements]
+
+def account_deleted(user_id: str, email: str, changed_post_ids: set, deleted_post_ids: List[str]) -> None:
+    user_deleted(user_id, email)
+    posts_deleted(deleted_post_ids)
+    for post_id in changed_post_ids - set(deleted_post_ids):
+        post_changed(post_id)
 
 
 class UserService:
@@ -70,4 +104,101 @@ class UserService:
 
     def get_user_by_id(self, user_id: str) -> User:
         """Get user by ID"""
-        return self.db.query(User).filter(User.id == user_id).first()
\ No newline at end of file
+        return self.db.query(User).filter(User.id == user_id).first()
+
+    def get_users_by_ids(self, user_ids: List[str]) -> Dict[str, User]:
+        """Get many users in one query, keyed by ID"""
+        users = self.db.query(User).filter(User.id.in_(set(user_ids))).all()
+        return {user.id: user for user in users}
+
+
+class AsyncUserService:
+    """Async counterpart of UserService used by the API routes"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def check_email_exists(self, email: str) -> bool:
+        """Check if email already exists in database"""
+        return await self.get_user_by_email(email) is not None
+
+    async def check_username_exists(self, username: str) -> bool:
+        """Check if username already exists in database"""
+        result = await self.db.execute(select(User.id).filter(User.username == username))
+        return result.first() is not None
+
+    def validate_password(self, password: str) -> None:
+        """Validate password requirements"""
+        if len(password) < 6:
+            raise HTTPException(
+                status_code=400,
+                detail="Password has to be at least 6 characters"
+            )
+
+    async def create_user(self, user_data: UserCreate) -> User:
+        """Create a new user with validation"""
+        # Check if email already exists
+        if await self.check_email_exists(user_data.email.lower()):
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+        # Check if username already exists
+        if await self.check_username_exists(user_data.username):
+            raise HTTPException(status_code=400, detail="Username already exists")
+
+        # Validate password length
+        self.validate_password(user_data.password)
+
+        # Create user
+        hashed_password = await hash_password_async(user_data.password)
+        db_user = User(
+            username=user_data.username,
+            email=user_data.email,
+            hashed_password=hashed_password
+        )
+        self.db.add(db_user)
+        await self.db.commit()
+        return db_user
+
+    async def authenticate_user(self, user_data: UserLogin) -> User:
+        """Authenticate user login"""
+        user = await self.get_user_by_email(user_data.email)
+
+        if not user or not await verify_password_async(user_data.password, user.hashed_password):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+
+        # Upgrade hashes made with an older cost while we have the plain password
+        if password_needs_rehash(user.hashed_password):
+            user.hashed_password = await hash_password_async(user_data.password)
+            await self.db.commit()
+            invalidate_cached_user(user.email)
+
+        return user
+
+    async def get_user_by_email(self, email: str) -> User:
+        """Get user by email"""
+        result = await self.db.execute(select(User).filter(func.lower(User.email) == email.lower()))
+        return result.scalars().first()
+
+    async def get_user_by_id(self, user_id: str) -> User:
+        """Get user by ID"""
+        result = await self.db.execute(select(User).filter(User.id == user_id))
+        return result.scalars().first()
+
+    async def get_users_by_ids(self, user_ids: List[str]) -> Dict[str, User]:
+        """Get many users in one query, keyed by ID"""
+        result = await self.db.execute(select(User).filter(User.id.in_(set(user_ids))))
+        return {user.id: user for user in result.scalars().all()}
+
+    async def delete_user(self, user_id: str, email: str) -> None:
+        """Delete a user with their posts, comments, likes, follows and emails in a fixed number of statements"""
+        (uncount_likes, uncount_comments, uncount_follows,
+         delete_posts, delete_emails, delete_account) = account_deletion(user_id, email)
+
+        changed = set((await self.db.execute(uncount_likes)).scalars())
+        changed |= set((await self.db.execute(uncount_comments)).scalars())
+        await self.db.execute(uncount_follows)
+        deleted = (await self.db.execute(delete_posts)).scalars().all()
+        await self.db.execute(delete_emails)
+        await self.db.execute(delete_account)
+        await self.db.commit()
+        account_deleted(user_id, email, changed, deleted)
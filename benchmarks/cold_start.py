@@ -0,0 +1,166 @@
+"""
+Cold start time, as seen by the first request to a new serverless instance.
+Starts a fresh interpreter per run that imports app.main, runs the startup
+handlers and serves one request, and times each step: the import, startup,
+the first request (which opens the first connection and compiles its
+queries) and a second request for comparison. It exits non-zero when
+startup regresses:
+
+- a module that must be imported on first use (DEFERRED_MODULES) is loaded
+  by importing the app, whatever the timings
+- the median import or time to first response is over --max-import-ms or
+  --max-first-response-ms
+- with --baseline, either median is more than --tolerance slower than in
+  that earlier results file
+
+Usage:
+    python -m benchmarks.cold_start                               # SQLite file, production settings
+    python -m benchmarks.cold_start --output before.json
+    python -m benchmarks.cold_start --baseline before.json --tolerance 0.2
+    python -m benchmarks.cold_start --max-import-ms 1500 --max-first-response-ms 2000
+
+The usual settings (SECRET_KEY, SMTP_*, BREVO_API_KEY, ...) are read from the
+environment or .env as for the app; DATABASE_URL is taken from --database-url
+and ENVIRONMENT from --environment.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.run import git_commit, percentile
+from benchmarks.seed import Scale, seed
+
+# only needed once an email is sent or a Postgres-only statement is built
+DEFERRED_MODULES = ("smtplib", "email.mime", "sib_api_v3_sdk", "sqlalchemy.dialects.postgresql")
+STEPS = ("import_ms", "startup_ms", "first_request_ms", "second_request_ms", "first_response_ms")
+
+# run in a new interpreter each time, so nothing is already imported or connected
+RUN = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+loaded = [name for name in {deferred!r} if name in sys.modules]
+
+from fastapi.testclient import TestClient
+client_ready = time.perf_counter()
+with TestClient(app.main.app) as client:
+    up = time.perf_counter()
+    first = client.get({path!r})
+    first_done = time.perf_counter()
+    second = client.get({path!r})
+    second_done = time.perf_counter()
+
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (up - client_ready) * 1000,
+    "first_request_ms": (first_done - up) * 1000,
+    "second_request_ms": (second_done - first_done) * 1000,
+    "first_response_ms": (imported - started + first_done - client_ready) * 1000,
+    "status": [first.status_code, second.status_code],
+    "deferred_loaded": loaded,
+}}))
+"""
+
+
+def cold_start(path: str) -> dict:
+    script = RUN.format(deferred=DEFERRED_MODULES, path=path)
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Cold start run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs: list) -> dict:
+    summary = {}
+    for step in STEPS:
+        values = sorted(run[step] for run in runs)
+        summary[step] = {"p50": round(percentile(values, 0.50), 1), "p95": round(percentile(values, 0.95), 1),
+                         "min": round(values[0], 1)}
+    return summary
+
+
+def regressions(results: dict, args) -> list:
+    """Reasons the run fails its budget; empty when it passes"""
+    failures = [f"{name} is imported at startup" for name in results["deferred_loaded"]]
+    if any(code >= 400 for code in results["status"]):
+        failures.append(f"{args.path} answered {results['status']}")
+
+    steps = results["steps"]
+    limits = [("import_ms", args.max_import_ms), ("first_response_ms", args.max_first_response_ms)]
+    failures += [f"median {step} {steps[step]['p50']} is over the {limit} budget"
+                 for step, limit in limits if limit is not None and steps[step]["p50"] > limit]
+
+    if args.baseline:
+        before = json.loads(args.baseline.read_text())["steps"]
+        for step, _ in limits:
+            allowed = before[step]["p50"] * (1 + args.tolerance)
+            if steps[step]["p50"] > allowed:
+                failures.append(f"median {step} {steps[step]['p50']} is more than {args.tolerance:.0%} "
+                                f"over the baseline's {before[step]['p50']}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///benchmark_cold_start.db")
+    parser.add_argument("--no-seed", action="store_true", help="use the data already in the database")
+    parser.add_argument("--environment", default="production", help="ENVIRONMENT the app starts with")
+    parser.add_argument("--path", default="/api/posts", help="the first request")
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters started")
+    parser.add_argument("--max-import-ms", type=float, help="budget for the median import of app.main")
+    parser.add_argument("--max-first-response-ms", type=float,
+                        help="budget for the median import, startup and first request together")
+    parser.add_argument("--baseline", type=Path, help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown over --baseline that fails")
+    parser.add_argument("--output", type=Path, help="write the results here, e.g. as a later --baseline")
+    args = parser.parse_args()
+
+    # the runs inherit these, and settings are read once per process
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["ENVIRONMENT"] = args.environment
+
+    if not args.no_seed:
+        # the schema a migrated production database would have, as startup doesn't create it there
+        counts = seed(args.database_url, Scale(users=50, posts_per_user=20), reset=True)
+        print("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+
+    runs = [cold_start(args.path) for _ in range(args.runs)]
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": args.database_url.split(":", 1)[0],
+            "environment": args.environment,
+            "path": args.path,
+            "runs": args.runs,
+        },
+        "steps": summarize(runs),
+        "status": runs[-1]["status"],
+        "deferred_loaded": sorted({name for run in runs for name in run["deferred_loaded"]}),
+    }
+
+    print(f"{'step':<20} {'p50 ms':>8} {'p95 ms':>8} {'min ms':>8}")
+    for step, row in results["steps"].items():
+        print(f"{step:<20} {row['p50']:>8} {row['p95']:>8} {row['min']:>8}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"\nResults written to {args.output}")
+
+    failures = regressions(results, args)
+    if failures:
+        sys.exit("\nStartup regressed:\n" + "\n".join(f"- {failure}" for failure in failures))
+    print("\nStartup within budget")
+
+
+if __name__ == "__main__":
+    main()
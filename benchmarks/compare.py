@@ -0,0 +1,39 @@
+"""
+Compare two benchmark result files written by benchmarks.run.
+Prints each route's latency, throughput and queries per request side by side
+with the relative change, e.g. before and after a commit.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+
+import json
+import sys
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms", "queries_per_request")
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "    n/a"
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+
+def compare(before: dict, after: dict) -> None:
+    print(f"before: {before['meta']['commit']} {before['meta']['timestamp']}")
+    print(f"after:  {after['meta']['commit']} {after['meta']['timestamp']}\n")
+
+    routes = [("TOTAL", before["total"], after["total"])] + [
+        (name, route, after["routes"][name]) for name, route in before["routes"].items() if name in after["routes"]
+    ]
+    for name, old, new in routes:
+        print(name)
+        for metric in METRICS:
+            print(f"  {metric:<20} {old[metric]:>10} -> {new[metric]:>10}  {change(old[metric], new[metric])}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1]) as old_file, open(sys.argv[2]) as new_file:
+        compare(json.load(old_file), json.load(new_file))
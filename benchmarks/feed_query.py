@@ -0,0 +1,95 @@
+"""
+Feed query benchmark: full ORM entities vs column-projected rows.
+Seeds a throwaway SQLite database, then for each page size reads the feed
+through PostService.get_all_posts (Post + User entities, then to_dict) and
+through PostService.get_feed_rows (row tuples), reporting time, rows/s and
+peak Python memory allocated while building the page.
+
+Usage:
+    python -m benchmarks.feed_query                     # 20000 posts, limits 50 500 5000 20000
+    python -m benchmarks.feed_query 100000 1000 50000   # posts to seed, then page sizes
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.database.main import Base
+from app.users.models import User
+from app.posts.models import Post
+from app.comments.models import Comment
+from app.likes.models import Like
+from app.auth.model import EmailVerificationToken
+from app.posts.service import PostService
+
+USERS = 200
+
+
+def seed(engine, post_count: int) -> None:
+    """Bulk insert users and posts with distinct timestamps"""
+    Base.metadata.create_all(engine)
+    user_ids = [str(uuid.uuid4()) for _ in range(USERS)]
+    start = datetime.now(timezone.utc)
+
+    with engine.begin() as connection:
+        connection.execute(insert(User), [
+            {"id": user_id, "username": f"user{i}", "email": f"user{i}@example.com",
+             "hashed_password": "x", "is_verified": True}
+            for i, user_id in enumerate(user_ids)
+        ])
+        connection.execute(insert(Post), [
+            {"id": str(uuid.uuid4()), "text": f"benchmark post {i} " * 5, "user_id": user_ids[i % USERS],
+             "created_at": start - timedelta(seconds=i), "like_count": i % 50, "comment_count": i % 9}
+            for i in range(post_count)
+        ])
+
+
+def orm_page(db: Session, limit: int) -> list:
+    return [post.to_dict() for post in PostService(db).get_all_posts(0, limit)]
+
+
+def rows_page(db: Session, limit: int) -> list:
+    return [row._asdict() for row in PostService(db).get_feed_rows(0, limit)]
+
+
+def measure(engine, read_page, limit: int, repeat: int = 3):
+    """Best wall time over repeat runs, and peak traced memory of one run, each in a fresh session"""
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            page = read_page(db, limit)
+            timings.append(time.perf_counter() - start)
+
+    with Session(engine) as db:
+        tracemalloc.start()
+        page = read_page(db, limit)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return len(page), min(timings), peak
+
+
+def main(post_count: int, limits: list) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine("sqlite:///" + os.path.join(directory, "feed.db"))
+        seed(engine, post_count)
+        print(f"Seeded {post_count} posts from {USERS} users\n")
+        print(f"{'limit':>7}  {'path':<6}  {'ms':>9}  {'rows/s':>10}  {'peak MiB':>9}")
+
+        for limit in limits:
+            for name, read_page in (("orm", orm_page), ("rows", rows_page)):
+                rows, seconds, peak = measure(engine, read_page, limit)
+                print(f"{limit:>7}  {name:<6}  {seconds * 1000:>9.1f}  {rows / seconds:>10.0f}  {peak / 2**20:>9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else 20000, args[1:] or [50, 500, 5000, 20000])
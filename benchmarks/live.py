@@ -0,0 +1,107 @@
+"""
+Live feed benchmark: idle GET /api/live connections held by one worker.
+Serves the live router with uvicorn in this process, opens N real TCP
+connections that sit idle on the stream, then reports memory per connection
+and how long one published event takes to reach every subscriber.
+The clients run in the same process, so memory per connection includes both
+ends of each socket and is an upper bound for the server side.
+
+Usage:
+    python -m benchmarks.live                 # 5000 connections, 20 events
+    python -m benchmarks.live 10000 50        # connections, events
+"""
+
+import asyncio
+import os
+import resource
+import statistics
+import sys
+import time
+import uvicorn
+from fastapi import FastAPI
+
+from app.live.hub import live_hub
+from app.live.routes import router as live_router
+
+HOST, PORT = "127.0.0.1", 8799
+REQUEST = f"GET /api/live HTTP/1.1\r\nHost: {HOST}\r\nAccept: text/event-stream\r\n\r\n".encode()
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def raise_file_limit(connections: int) -> None:
+    """Each connection costs two descriptors here, one per end"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = connections * 2 + 100
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+
+async def open_stream():
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    writer.write(REQUEST)
+    await reader.readuntil(b"retry: ")
+    return reader, writer
+
+
+async def receive(reader, event_id: int) -> float:
+    await reader.readuntil(b"id: %d\n" % event_id)
+    return time.perf_counter()
+
+
+async def main(connections: int, events: int) -> None:
+    app = FastAPI()
+    app.include_router(live_router, prefix="/api")
+    live_hub.max_subscribers = max(live_hub.max_subscribers, connections)
+
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT, log_level="warning",
+                                           lifespan="off", backlog=4096))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    baseline = rss_bytes()
+    start = time.perf_counter()
+    streams = []
+    for offset in range(0, connections, 500):
+        batch = min(500, connections - offset)
+        streams += await asyncio.gather(*(open_stream() for _ in range(batch)))
+    connect_seconds = time.perf_counter() - start
+    await asyncio.sleep(1)
+    held = rss_bytes()
+
+    print(f"Connections:        {len(live_hub)} open in {connect_seconds:.2f}s")
+    print(f"Memory:             {(held - baseline) / 2**20:.1f} MiB total, "
+          f"{(held - baseline) / connections / 1024:.1f} KiB per connection")
+
+    latencies = []
+    for _ in range(events):
+        event_id = live_hub.published + 1
+        waiters = [asyncio.create_task(receive(reader, event_id)) for reader, _ in streams]
+        await asyncio.sleep(0)
+        published = time.perf_counter()
+        live_hub.publish("benchmark", {"n": event_id, "text": "x" * 100})
+        latencies.append(max(await asyncio.gather(*waiters)) - published)
+
+    latencies.sort()
+    print(f"Fan-out to all:     p50 {statistics.median(latencies) * 1000:.1f} ms, "
+          f"max {latencies[-1] * 1000:.1f} ms over {events} events")
+    print(f"Dropped:            {live_hub.dropped}")
+
+    for _, writer in streams:
+        writer.close()
+    server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    count = args[0] if args else 5000
+    raise_file_limit(count)
+    asyncio.run(main(count, args[1] if len(args) > 1 else 20))
@@ -0,0 +1,164 @@
+"""
+Feed latency during a credential-stuffing flood against /api/login.
+Seeds a database, then measures GET /api/posts from ordinary clients three
+times: with no flood, while one address floods /api/login with wrong
+passwords for many emails with the auth rate limiter off, and the same flood
+with the limiter on. The app runs in-process on one event loop, so every
+login the limiter lets through competes with the feed for the same worker.
+
+Usage:
+    python -m benchmarks.login_flood                              # SQLite file, 200 logins/s, 20s phases
+    python -m benchmarks.login_flood --flood-rate 500 --seconds 60
+    python -m benchmarks.login_flood --database-url postgresql://... --no-seed
+
+The usual settings (SECRET_KEY, SMTP_*, BREVO_API_KEY, ...) are read from the
+environment or .env as for the app; DATABASE_URL is taken from --database-url.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+from benchmarks.run import percentile
+from benchmarks.seed import add_scale_arguments, scale_from_args, seed
+
+FLOOD_ADDRESS = ("203.0.113.7", 40000)
+FEED_ADDRESS = ("198.51.100.1", 40000)
+
+
+async def measure_feed(client, seconds: float, concurrency: int) -> dict:
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def reader():
+        page = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get("/api/posts", params={"skip": page % 10 * 20, "limit": 20})
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            page += 1
+
+    await asyncio.gather(*(reader() for _ in range(concurrency)))
+    latencies.sort()
+    return {"p50_ms": percentile(latencies, 0.50) * 1000, "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000, "feed_rps": len(latencies) / seconds}
+
+
+async def login_attempt(app, email: str) -> int:
+    """POST /api/login straight into the ASGI app, so the flood costs only what the server spends on it"""
+    body = json.dumps({"email": email, "password": "not-the-password"}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/login", "raw_path": b"/api/login", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": FLOOD_ADDRESS, "server": ("benchmark", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def flood(app, rate: float, in_flight: int, users: int, statuses: Counter, stop: asyncio.Event):
+    """Offer logins at a fixed rate, like an attacker with in_flight connections open"""
+    slots = asyncio.Semaphore(in_flight)
+    tasks = set()
+
+    async def attempt(n: int):
+        try:
+            statuses[await login_attempt(app, f"user{n % users}@benchmark.example")] += 1
+        finally:
+            slots.release()
+
+    n, start = 0, time.perf_counter()
+    while not stop.is_set():
+        if not slots.locked():
+            await slots.acquire()
+            task = asyncio.create_task(attempt(n))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        else:
+            statuses["not sent"] += 1
+        n += 1
+        await asyncio.sleep(max(0.0, start + n / rate - time.perf_counter()))
+    await asyncio.gather(*tasks)
+
+
+async def drive(args) -> list:
+    import httpx
+    from app.main import app
+    from app.config import get_settings
+    from app.auth.ratelimit import auth_limiter
+
+    # the feed client's own per-request log lines would be charged to the server
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    settings = get_settings()
+    rows = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, client=FEED_ADDRESS)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as feed_client:
+            await measure_feed(feed_client, 2, args.concurrency)  # warm up
+
+            for phase, flooding, limited in (("no flood", False, False), ("flood, no limiter", True, False),
+                                             ("flood, limiter", True, True)):
+                settings.rate_limit_enabled = settings.rate_limit_per_ip = limited
+                auth_limiter.reset()
+                statuses, stop = Counter(), asyncio.Event()
+                flooding_task = asyncio.create_task(
+                    flood(app, args.flood_rate, args.flood_connections, args.users, statuses, stop)) if flooding else None
+
+                feed = await measure_feed(feed_client, args.seconds, args.concurrency)
+                if flooding_task:
+                    stop.set()
+                    await flooding_task
+
+                rows.append({"phase": phase, **feed, "attempted": sum(statuses.values()),
+                             "bcrypt": statuses[401], "rejected": statuses[429], "overloaded": statuses[503],
+                             "not_sent": statuses["not sent"]})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///benchmark.db")
+    parser.add_argument("--no-seed", action="store_true", help="use the data already in the database")
+    parser.add_argument("--seconds", type=float, default=20, help="length of each phase")
+    parser.add_argument("--concurrency", type=int, default=8, help="feed requests in flight at once")
+    parser.add_argument("--flood-rate", type=float, default=200, help="login attempts offered per second")
+    parser.add_argument("--flood-connections", type=int, default=64,
+                        help="most login attempts in flight; attempts beyond it are not sent")
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    # settings are read once per process, so the database has to be chosen before the app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+
+    if not args.no_seed:
+        counts = seed(args.database_url, scale_from_args(args), reset=True)
+        print("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+
+    rows = asyncio.run(drive(args))
+    print(f"{'phase':<20} {'feed/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'logins':>7} {'bcrypt':>7} {'429':>7} {'503':>7} {'not sent':>9}")
+    for row in rows:
+        print(f"{row['phase']:<20} {row['feed_rps']:>7.0f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+              f"{row['attempted']:>7} {row['bcrypt']:>7} {row['rejected']:>7} {row['overloaded']:>7} "
+              f"{row['not_sent']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+End-to-end API benchmark.
+Seeds a database, drives the real app.main:app through an in-process ASGI
+client with a weighted route mix, and reports p50/p95/p99 latency, requests
+per second and DB queries per request for each route. Results are written as
+JSON so runs can be compared across commits with benchmarks.compare.
+
+Usage:
+    python -m benchmarks.run                                      # SQLite file, default scale and mix
+    python -m benchmarks.run --database-url postgresql://... --concurrency 32 --requests 5000
+    python -m benchmarks.run --mix feed=70,post=30 --output feed.json
+    python -m benchmarks.run --no-seed                            # reuse an already seeded database
+
+The usual settings (SECRET_KEY, SMTP_*, BREVO_API_KEY, ...) are read from the
+environment or .env as for the app; DATABASE_URL is taken from --database-url.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.seed import BENCHMARK_PASSWORD, add_scale_arguments, scale_from_args, seed
+
+DEFAULT_MIX = "feed=30,feed_viewer=10,post=15,comments=15,user_posts=5,like=15,login=10"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# query counter of the request running in the current task; the ASGI client calls the app in-task
+current_queries = contextvars.ContextVar("current_queries", default=None)
+
+
+class State:
+    """What the operations pick from: seeded ids, per-user tokens and the likes made so far"""
+
+    def __init__(self, users: list, post_ids: list, tokens: dict, rng: random.Random):
+        self.users = users
+        self.post_ids = post_ids
+        self.tokens = tokens
+        self.rng = rng
+        self.liked = set()
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+    def post_id(self) -> str:
+        return self.rng.choice(self.post_ids)
+
+    def auth(self, user) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user.id]}"}
+
+
+async def feed(client, state: State):
+    return await client.get("/api/posts", params={"skip": state.rng.randrange(10) * 20, "limit": 20})
+
+async def feed_viewer(client, state: State):
+    return await client.get("/api/posts", params={"skip": state.rng.randrange(10) * 20, "limit": 20},
+                            headers=state.auth(state.user()))
+
+async def post(client, state: State):
+    return await client.get(f"/api/posts/{state.post_id()}")
+
+async def comments(client, state: State):
+    return await client.get(f"/api/{state.post_id()}/comments", params={"limit": 20})
+
+async def user_posts(client, state: State):
+    return await client.get(f"/api/users/{state.user().id}/posts", params={"limit": 20})
+
+async def like(client, state: State):
+    """Like a post, or unlike it if this run already liked it"""
+    user, post_id = state.user(), state.post_id()
+    key = (user.id, post_id)
+    if key in state.liked:
+        state.liked.discard(key)
+        return await client.delete("/api/likes", params={"post_id": post_id}, headers=state.auth(user))
+    state.liked.add(key)
+    return await client.post("/api/likes", params={"post_id": post_id}, headers=state.auth(user))
+
+async def login(client, state: State):
+    return await client.post("/api/login", json={"email": state.user().email, "password": BENCHMARK_PASSWORD})
+
+
+OPERATIONS = {operation.__name__: operation for operation in
+              (feed, feed_viewer, post, comments, user_posts, like, login)}
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown route '{name}', choose from: {', '.join(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: list, duration: float) -> dict:
+    """samples are (latency seconds, status code, query count) tuples"""
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    statuses = Counter(str(sample[1]) for sample in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(count for status, count in statuses.items() if int(status) >= 500),
+        "statuses": dict(sorted(statuses.items())),
+        "rps": round(len(samples) / duration, 1) if duration else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "queries_per_request": round(sum(sample[2] for sample in samples) / len(samples), 2) if samples else 0.0,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def load_state(rng: random.Random) -> State:
+    from sqlalchemy import select
+    from app.database.main import get_async_sessionmaker
+    from app.users.models import User
+    from app.posts.models import Post
+    from app.auth.schema import CurrentUser
+    from app.auth.service import access_token_claims, create_access_token
+
+    async with get_async_sessionmaker()() as db:
+        users = [CurrentUser.from_user(user) for user in (await db.execute(select(User))).scalars()]
+        post_ids = list((await db.execute(select(Post.id))).scalars())
+
+    if not users or not post_ids:
+        raise SystemExit("The database has no users or posts; run without --no-seed")
+
+    # tokens are minted directly so only the login route pays for bcrypt
+    tokens = {user.id: create_access_token(access_token_claims(user)) for user in users}
+    return State(users, post_ids, tokens, rng)
+
+
+async def drive(args, weights: dict) -> dict:
+    import httpx
+    from sqlalchemy import event
+    from app.main import app
+    from app.database.main import get_async_engine
+    from app.config import get_settings
+
+    rng = random.Random(args.seed)
+    names, name_weights = list(weights), list(weights.values())
+    samples = defaultdict(list)
+
+    async with app.router.lifespan_context(app):
+        @event.listens_for(get_async_engine().sync_engine, "before_cursor_execute")
+        def count_query(conn, cursor, statement, parameters, context, executemany):
+            queries = current_queries.get()
+            if queries is not None:
+                queries[0] += 1
+
+        state = await load_state(rng)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            async def worker(requests: int, record: bool):
+                for _ in range(requests):
+                    name = rng.choices(names, name_weights)[0]
+                    queries = [0]
+                    current_queries.set(queries)
+                    start = time.perf_counter()
+                    response = await OPERATIONS[name](client, state)
+                    elapsed = time.perf_counter() - start
+                    if record:
+                        samples[name].append((elapsed, response.status_code, queries[0]))
+
+            async def run(total: int, record: bool) -> float:
+                share, extra = divmod(total, args.concurrency)
+                start = time.perf_counter()
+                await asyncio.gather(*(worker(share + (i < extra), record) for i in range(args.concurrency)))
+                return time.perf_counter() - start
+
+            await run(args.warmup, record=False)
+            duration = await run(args.requests, record=True)
+
+        settings = get_settings()
+        flags = {name: getattr(settings, name) for name in ("fast_responses", "stateless_auth", "bcrypt_rounds",
+                                                            "response_cache_size", "user_cache_size")}
+
+    all_samples = [sample for route_samples in samples.values() for sample in route_samples]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": args.database_url.split(":", 1)[0],
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "mix": weights,
+            "seed": args.seed,
+            "settings": flags,
+        },
+        "total": summarize(all_samples, duration),
+        "routes": {name: summarize(samples[name], duration) for name in names if samples[name]},
+    }
+
+
+def print_report(results: dict) -> None:
+    header = f"{'route':<12} {'reqs':>6} {'err':>4} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6}"
+    print(header)
+    print("-" * len(header))
+    rows = list(results["routes"].items()) + [("TOTAL", results["total"])]
+    for name, route in rows:
+        print(f"{name:<12} {route['requests']:>6} {route['errors']:>4} {route['rps']:>8} {route['p50_ms']:>8} "
+              f"{route['p95_ms']:>8} {route['p99_ms']:>8} {route['queries_per_request']:>6}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///benchmark.db")
+    parser.add_argument("--no-seed", action="store_true", help="use the data already in the database")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests")
+    parser.add_argument("--warmup", type=int, default=200, help="unmeasured requests sent first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route=weight list (routes: {', '.join(OPERATIONS)})")
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/<commit>-<time>.json)")
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+    weights = parse_mix(args.mix)
+
+    # settings are read once per process, so the database has to be chosen before the app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+    # every simulated user shares one client address, which the auth rate limiter would throttle
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    if not args.no_seed:
+        scale = scale_from_args(args)
+        counts = seed(args.database_url, scale, reset=True)
+        print("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+
+    results = asyncio.run(drive(args, weights))
+    results["meta"]["scale"] = None if args.no_seed else scale_from_args(args).to_dict()
+    print_report(results)
+
+    output = args.output or RESULTS_DIR / f"{results['meta']['commit']}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Full-text search latency on a large corpus.
+Seeds a database with posts only (a million by default), then times
+SearchService.search for queries of growing selectivity: one common word,
+two and three words that must all match, and a prefix of what is being typed.
+Each query is timed for the first page and for a page further in, reached
+through the cursor. Comments share the index, so a million posts stands in
+for a million posts and comments together.
+
+Usage:
+    python -m benchmarks.search                                   # SQLite file, 1M posts
+    python -m benchmarks.search --posts 100000 --repeat 50
+    python -m benchmarks.search --database-url postgresql://... --no-seed
+
+The usual settings (SECRET_KEY, SMTP_*, BREVO_API_KEY, ...) are read from the
+environment or .env as for the app; DATABASE_URL is taken from --database-url.
+"""
+
+import argparse
+import os
+import time
+from collections import Counter
+
+from benchmarks.run import percentile
+from benchmarks.seed import Scale, seed
+
+POSTS_PER_USER = 100
+SAMPLE_POSTS = 10_000
+
+
+def pick_queries(db) -> dict:
+    """Words from the seeded text, so the queries hit real rows whatever the seed"""
+    from sqlalchemy import text as sql
+
+    words = Counter()
+    for text in db.scalars(sql('SELECT text FROM "Posts" ORDER BY id LIMIT :n').bindparams(n=SAMPLE_POSTS)):
+        words.update(set(text.lower().rstrip(".").split()))
+    # the median word rather than the most frequent one, which is in nearly every post
+    ranked = sorted(words, key=lambda word: (-words[word], word))
+    common, other, third = ranked[len(ranked) // 2], ranked[len(ranked) // 3], ranked[len(ranked) // 4]
+    return {
+        "one word": common,
+        "two words": f"{common} {other}",
+        "three words": f"{common} {other} {third}",
+        "prefix": f"{common} {other[:3]}",
+    }
+
+
+def time_query(service, q: str, limit: int, repeat: int) -> dict:
+    from app.search.service import next_search_cursor
+
+    first, later = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = service.search(q, limit=limit)
+        first.append(time.perf_counter() - start)
+
+        # a few pages in, where the keyset condition has to skip what was already shown
+        cursor = None
+        for _ in range(3):
+            if len(rows) < limit:
+                break
+            cursor = next_search_cursor(rows, limit)
+            start = time.perf_counter()
+            rows = service.search(q, limit=limit, cursor=cursor)
+            later.append(time.perf_counter() - start)
+
+    first.sort()
+    later.sort()
+    return {"p50_ms": percentile(first, 0.50) * 1000, "p95_ms": percentile(first, 0.95) * 1000,
+            "later_p50_ms": percentile(later, 0.50) * 1000 if later else 0.0,
+            "later_p95_ms": percentile(later, 0.95) * 1000 if later else 0.0}
+
+
+def match_count(db, q: str) -> int:
+    """Every result reachable through the cursor; slow, so only run once per query"""
+    from app.search.service import SearchService, next_search_cursor
+
+    count, cursor = 0, None
+    while True:
+        rows = SearchService(db).search(q, limit=100, cursor=cursor)
+        count += len(rows)
+        cursor = next_search_cursor(rows, 100)
+        if cursor is None:
+            return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///benchmark_search.db")
+    parser.add_argument("--no-seed", action="store_true", help="use the data already in the database")
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=100, help="times each query is run")
+    parser.add_argument("--limit", type=int, default=20, help="results per page")
+    parser.add_argument("--count", action="store_true", help="also count the results each query can page through")
+    parser.add_argument("--seed", type=int, default=42, help="same seed, same data")
+    args = parser.parse_args()
+
+    # settings are read once per process, so the database has to be chosen before the app is imported
+    os.environ["DATABASE_URL"] = args.database_url
+
+    if not args.no_seed:
+        scale = Scale(users=max(1, args.posts // POSTS_PER_USER), posts_per_user=POSTS_PER_USER,
+                      comments_per_post=0, likes_per_post=0, seed=args.seed)
+        started = time.perf_counter()
+        counts = seed(args.database_url, scale, reset=True)
+        print("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items())
+              + f" in {time.perf_counter() - started:.0f}s")
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.search.service import SearchService
+
+    engine = create_engine(args.database_url)
+    with Session(engine) as db:
+        service = SearchService(db)
+        queries = pick_queries(db)
+        print(f"{'query':<13} {'q':<34} {'p50 ms':>8} {'p95 ms':>8} {'page 2+ p50':>12} {'page 2+ p95':>12}"
+              + (f" {'results':>9}" if args.count else ""))
+        for name, q in queries.items():
+            service.search(q, limit=args.limit)  # warm the page cache
+            row = time_query(service, q, args.limit, args.repeat)
+            print(f"{name:<13} {q!r:<34} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                  f"{row['later_p50_ms']:>12.2f} {row['later_p95_ms']:>12.2f}"
+                  + (f" {match_count(db, q):>9}" if args.count else ""))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Seed a database with fake users, posts, comments and likes for benchmarking.
+Every seeded user can log in with BENCHMARK_PASSWORD; counters on Posts match
+the seeded rows. The same --seed produces the same rows, dated relative to now.
+
+Usage:
+    python -m benchmarks.seed sqlite:///benchmark.db
+    python -m benchmarks.seed postgresql://... --users 1000 --posts-per-user 50 --reset
+"""
+
+import argparse
+import random
+import uuid
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from faker import Faker
+from sqlalchemy import create_engine, insert
+
+BENCHMARK_PASSWORD = "benchmark-password"
+BATCH_SIZE = 5000
+
+
+@dataclass
+class Scale:
+    users: int = 200
+    posts_per_user: int = 20
+    comments_per_post: int = 5
+    likes_per_post: int = 10
+    seed: int = 42
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def insert_batches(connection, table, rows: list) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+def seed(database_url: str, scale: Scale, reset: bool = False) -> dict:
+    """Create the schema and fill it; returns row counts"""
+    # imported here so the caller can point DATABASE_URL at the benchmark database first
+    from app.database.main import Base
+    from app.users.models import User
+    from app.posts.models import Post
+    from app.comments.models import Comment
+    from app.likes.models import Like
+    import app.follows.models  # new posts are fanned out to HomeTimelines
+    from app.auth.model import EmailVerificationToken
+    from app.emails.models import EmailOutbox
+    import app.search.models  # the search index is created and filled along with the tables
+    from app.auth.service import hash_password
+
+    fake = Faker()
+    Faker.seed(scale.seed)
+    rng = random.Random(scale.seed)
+    now = datetime.now(timezone.utc)
+
+    # bcrypt is slow on purpose, so every user shares one hash of the same password
+    hashed_password = hash_password(BENCHMARK_PASSWORD)
+    users = [
+        {"id": str(uuid.UUID(int=rng.getrandbits(128))), "username": f"{fake.user_name()}_{i}",
+         "email": f"user{i}@benchmark.example", "hashed_password": hashed_password, "is_verified": True}
+        for i in range(scale.users)
+    ]
+    user_ids = [user["id"] for user in users]
+
+    posts, comments, likes = [], [], []
+    for user_id in user_ids:
+        for _ in range(scale.posts_per_user):
+            post_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            created_at = now - timedelta(seconds=rng.randrange(30 * 24 * 3600))
+            likers = rng.sample(user_ids, min(scale.likes_per_post, len(user_ids)))
+
+            posts.append({"id": post_id, "text": fake.sentence(nb_words=20), "user_id": user_id,
+                          "created_at": created_at, "like_count": len(likers),
+                          "comment_count": scale.comments_per_post})
+            comments += [
+                {"id": str(uuid.UUID(int=rng.getrandbits(128))), "text": fake.sentence(), "user_id": rng.choice(user_ids),
+                 "post_id": post_id, "created_at": created_at + timedelta(seconds=rng.randrange(1, 86400))}
+                for _ in range(scale.comments_per_post)
+            ]
+            likes += [{"id": str(uuid.UUID(int=rng.getrandbits(128))), "user_id": liker, "post_id": post_id}
+                      for liker in likers]
+
+    engine = create_engine(database_url)
+    if reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        insert_batches(connection, User, users)
+        insert_batches(connection, Post, posts)
+        insert_batches(connection, Comment, comments)
+        insert_batches(connection, Like, likes)
+    engine.dispose()
+
+    return {"users": len(users), "posts": len(posts), "comments": len(comments), "likes": len(likes)}
+
+
+def add_scale_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = Scale()
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--posts-per-user", type=int, default=defaults.posts_per_user)
+    parser.add_argument("--comments-per-post", type=int, default=defaults.comments_per_post)
+    parser.add_argument("--likes-per-post", type=int, default=defaults.likes_per_post)
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="same seed, same data")
+
+
+def scale_from_args(args) -> Scale:
+    return Scale(args.users, args.posts_per_user, args.comments_per_post, args.likes_per_post, args.seed)
+
+
+if __name__ == "__main__":
+    import os
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database_url")
+    parser.add_argument("--reset", action="store_true", help="drop existing tables first")
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    counts = seed(args.database_url, scale_from_args(args), args.reset)
+    print("Seeded " + ", ".join(f"{count} {name}" for name, count in counts.items()))
@@ -0,0 +1,85 @@
+"""
+Serialization benchmark for list responses.
+Times turning a page of Post rows into JSON bytes the way the routes do it
+by default (model per row, then response_model validation and encoding) and
+through the FAST_RESPONSES path (one compiled TypeAdapter pass), per item.
+
+Usage:
+    python -m benchmarks.serialization                # pages of 1, 10, 50, 100, 500
+    python -m benchmarks.serialization 50 1000        # custom page sizes
+"""
+
+import sys
+import timeit
+import uuid
+from datetime import datetime, timezone
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.users.models import User
+from app.posts.models import Post
+from app.comments.models import Comment
+from app.likes.models import Like
+from app.auth.model import EmailVerificationToken
+from app.posts.schema import PostPublic
+from app.serialization import render_list
+
+# what FastAPI does with a returned list: validate against response_model, dump, json.dumps
+response_field = TypeAdapter(List[PostPublic])
+
+
+def build_posts(count: int) -> List[Post]:
+    """Transient rows shaped like a feed page, no database needed"""
+    user = User(id=str(uuid.uuid4()), username="benchmark", email="benchmark@example.com")
+    now = datetime.now(timezone.utc)
+    return [
+        Post(id=str(uuid.uuid4()), text=f"post number {i} " * 4, user_id=user.id, user=user,
+             created_at=now, like_count=i, comment_count=i % 7)
+        for i in range(count)
+    ]
+
+
+def response_model_path(posts: List[Post]) -> bytes:
+    """GET /users/{user_id}/posts and GET /{post_id}/comments by default"""
+    models = [PostPublic(**post.to_dict()) for post in posts]
+    content = response_field.dump_python(response_field.validate_python(models), mode="json")
+    return JSONResponse(content).body
+
+
+def jsonable_encoder_path(posts: List[Post]) -> bytes:
+    """GET /posts on a cache miss by default"""
+    return JSONResponse(jsonable_encoder([PostPublic(**post.to_dict()) for post in posts])).body
+
+
+def fast_path(posts: List[Post]) -> bytes:
+    """Any list route with FAST_RESPONSES=true"""
+    return render_list(PostPublic, [post.to_dict() for post in posts])
+
+
+PATHS = {
+    "response_model": response_model_path,
+    "jsonable_encoder": jsonable_encoder_path,
+    "fast (TypeAdapter)": fast_path,
+}
+
+
+def per_item_us(path, posts: List[Post]) -> float:
+    path(posts)  # warm up, builds the cached adapter
+    runs = max(20, 20000 // len(posts))
+    best = min(timeit.repeat(lambda: path(posts), number=runs, repeat=5))
+    return best / runs / len(posts) * 1e6
+
+
+def main(sizes: List[int]) -> None:
+    print(f"{'items':>6}  " + "  ".join(f"{name:>20}" for name in PATHS) + "  speedup")
+    for size in sizes:
+        posts = build_posts(size)
+        timings = [per_item_us(path, posts) for path in PATHS.values()]
+        cells = "  ".join(f"{t:>17.2f} us" for t in timings)
+        print(f"{size:>6}  {cells}  {timings[0] / timings[-1]:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1, 10, 50, 100, 500])
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Query plan regression check for the service layer.
+Runs the read queries issued by the services, EXPLAINs each captured
+statement and fails if any of them falls back to a full table scan.
+
+Usage:
+    python check_query_plans.py                       # in-memory SQLite
+    python check_query_plans.py postgresql://...      # Postgres (rolled back afterwards)
+"""
+
+import json
+import sys
+import uuid
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.database.main import Base
+from app.users.models import User
+from app.posts.models import Post
+from app.comments.models import Comment
+from app.likes.models import Like
+from app.auth.model import EmailVerificationToken
+from app.follows.models import Follow
+from app.users.service import UserService
+from app.posts.service import PostService, home_timeline_query, feed_rows_query
+from app.comments.service import CommentService
+from app.likes.service import LikeService
+from app.search.service import SearchService
+from app.follows.service import FollowService, follower_batch
+from app.database.pagination import encode_cursor
+
+TABLES = {"Users", "Posts", "Comments", "Likes", "Follows", "HomeTimelines"}
+
+
+def seed(db: Session):
+    """Insert a handful of rows so every query has something to look at"""
+    user = User(id=str(uuid.uuid4()), username="plan_check", email="plan_check@example.com",
+                hashed_password="x", is_verified=True)
+    reader = User(id=str(uuid.uuid4()), username="plan_check_reader", email="plan_check_reader@example.com",
+                  hashed_password="x", is_verified=True)
+    db.add_all([user, reader])
+    db.flush()
+    db.add(Follow(follower_id=reader.id, followee_id=user.id))
+    db.flush()
+
+    posts = [Post(id=str(uuid.uuid4()), text=f"post {i}", user_id=user.id) for i in range(3)]
+    db.add_all(posts)
+    db.flush()
+
+    db.add(Comment(id=str(uuid.uuid4()), text="comment", user_id=user.id, post_id=posts[0].id))
+    db.add(Like(id=str(uuid.uuid4()), user_id=user.id, post_id=posts[0].id))
+    db.flush()
+    db.refresh(posts[0])
+    return user, posts[0]
+
+
+def service_queries(db: Session, user: User, post: Post):
+    """The read paths served by the API, keyed by a readable name"""
+    cursor = encode_cursor(post.created_at, post.id)
+    return {
+        "PostService.get_all_posts": lambda: PostService(db).get_all_posts(0, 50),
+        "PostService.get_all_posts(cursor)": lambda: PostService(db).get_all_posts(0, 50, cursor),
+        "PostService.get_feed_rows": lambda: PostService(db).get_feed_rows(0, 50),
+        "PostService.get_feed_rows(user, cursor)": lambda: PostService(db).get_feed_rows(0, 10, cursor, user.id),
+        "PostService.get_post_by_id": lambda: PostService(db).get_post_by_id(post.id),
+        "PostService.get_user_posts": lambda: PostService(db).get_user_posts(user.id, 0, 10),
+        "PostService.get_user_posts(cursor)": lambda: PostService(db).get_user_posts(user.id, 0, 10, cursor),
+        "CommentService.get_post_comments": lambda: CommentService(db).get_post_comments(post.id, 0, 10),
+        "CommentService.get_post_comments(cursor)": lambda: CommentService(db).get_post_comments(post.id, 0, 10, cursor),
+        "LikeService.get_user_likes": lambda: LikeService(db).get_user_likes(user.id),
+        "LikeService.get_liked_post_ids": lambda: LikeService(db).get_liked_post_ids(user.id, [post.id]),
+        "UserService.get_user_by_id": lambda: UserService(db).get_user_by_id(user.id),
+        "UserService.get_user_by_email": lambda: UserService(db).get_user_by_email(user.email),
+        "UserService.check_username_exists": lambda: UserService(db).check_username_exists(user.username),
+        "PostService.get_home_rows": lambda: PostService(db).get_home_rows(user.id, 10),
+        "PostService.get_home_rows(cursor)": lambda: PostService(db).get_home_rows(user.id, 10, cursor),
+        "home_timeline_query(merged account)": lambda: db.execute(home_timeline_query(user.id, [user.id], cursor, 10)).all(),
+        "AsyncPostService.get_trending_rows": lambda: db.execute(feed_rows_query().filter(Post.id.in_([post.id]))).all(),
+        "FollowService.fan_out(follower batch)": lambda: db.execute(follower_batch(user.id, "")).all(),
+        "FollowService.get_merged_accounts": lambda: FollowService(db).get_merged_accounts(user.id),
+        "SearchService.search": lambda: SearchService(db).search("post"),
+        "SearchService.search(comment)": lambda: SearchService(db).search("comm", "comment"),
+    }
+
+
+def sqlite_full_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    details = [row[-1] for row in rows]
+
+    # walking a whole index is only cheap when it also yields the ORDER BY, so LIMIT stops early
+    sorts = any(d.startswith("USE TEMP B-TREE FOR ORDER BY") for d in details)
+    scans = [d for d in details
+             if d.startswith("SCAN ") and d.split()[1].strip('"') in TABLES
+             and ("USING" not in d or sorts)]
+    return scans, details
+
+
+def postgres_full_scans(connection, statement, parameters):
+    plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans, nodes, stack = [], [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append(f"{node['Node Type']} {node.get('Relation Name', '')}".strip())
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in TABLES:
+            scans.append(nodes[-1])
+        stack.extend(node.get("Plans", []))
+    return scans, nodes
+
+
+def check(database_url: str) -> bool:
+    engine = create_engine(database_url)
+    dialect = engine.dialect.name
+    captured = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("capture"):
+            captured.append((statement, parameters))
+
+    ok = True
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            Base.metadata.create_all(connection)
+            if dialect == "postgresql":
+                # with tiny tables a seq scan is always cheapest; only allow it if no index applies
+                connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+            db = Session(bind=connection, join_transaction_mode="create_savepoint")
+            user, post = seed(db)
+
+            for name, run in service_queries(db, user, post).items():
+                captured.clear()
+                db.expunge_all()
+                connection.info["capture"] = True
+                try:
+                    run()
+                finally:
+                    connection.info["capture"] = False
+
+                for statement, parameters in captured:
+                    if dialect == "postgresql":
+                        scans, plan = postgres_full_scans(connection, statement, parameters)
+                    else:
+                        scans, plan = sqlite_full_scans(connection, statement, parameters)
+
+                    status = "FAIL" if scans else "ok"
+                    ok = ok and not scans
+                    print(f"[{status}] {name}")
+                    for line in plan:
+                        print(f"       {line}")
+        finally:
+            transaction.rollback()
+
+    engine.dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "sqlite://"
+    if check(url):
+        print("✅ No full table scans in service queries")
+    else:
+        print("❌ Some service queries fall back to a full table scan")
+        sys.exit(1)
@@ -29,12 +29,23 @@ load_dotenv()
 # Import your models and Base
 from app.database.main import Base
 from app.users.models import User
-from app.posts.models import Post
+from app.posts.models import Post, TrendingScore
 from app.comments.models import Comment
 from app.likes.models import Like
+from app.emails.models import EmailOutbox
+from app.auth.model import EmailVerificationToken
+from app.follows.models import Follow, TimelineEntry
 
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave autogenerate off what app.search.models creates with raw DDL: the FTS5 tables on
+    SQLite and the search_vector columns and indexes on Postgres"""
+    if type_ == "table" and name and name.startswith("Search"):
+        return False
+    return name is None or "search_vector" not in name
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -61,6 +72,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -93,7 +105,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,34 @@
+"""add trending scores
+
+Revision ID: 3d6a8e1f4b72
+Revises: 9b4e2f7c1a36
+Create Date: 2026-10-18 17:42:11.508316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3d6a8e1f4b72'
+down_revision: Union[str, Sequence[str], None] = '9b4e2f7c1a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # starts empty: the ranking builds up from new likes and comments
+    op.create_table(
+        'TrendingScores',
+        sa.Column('post_id', sa.String(length=36), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['Posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('post_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('TrendingScores')
@@ -0,0 +1,36 @@
+"""add post like and comment counts
+
+Revision ID: 3f1a9c2d7b64
+Revises: 53c3641d6c19
+Create Date: 2026-10-18 10:05:12.418306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3f1a9c2d7b64'
+down_revision: Union[str, Sequence[str], None] = '53c3641d6c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('Posts', sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('Posts', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+
+    # backfill from the existing rows
+    op.execute(
+        'UPDATE "Posts" SET '
+        'like_count = (SELECT COUNT(*) FROM "Likes" WHERE "Likes".post_id = "Posts".id), '
+        'comment_count = (SELECT COUNT(*) FROM "Comments" WHERE "Comments".post_id = "Posts".id)'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('Posts', 'comment_count')
+    op.drop_column('Posts', 'like_count')
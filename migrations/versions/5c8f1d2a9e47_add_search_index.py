@@ -0,0 +1,86 @@
+"""add search index
+
+Revision ID: 5c8f1d2a9e47
+Revises: e41d7a9c3b58
+Create Date: 2026-10-18 14:20:37.104215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '5c8f1d2a9e47'
+down_revision: Union[str, Sequence[str], None] = 'e41d7a9c3b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, kind, column holding the post id)
+SOURCES = [('Posts', 'post', 'id'), ('Comments', 'comment', 'post_id')]
+
+
+def sqlite_triggers(table, kind, post_id):
+    # batch-mode rebuilds of these tables drop their triggers; later migrations must recreate them
+    name = table.lower()
+    return [
+        f'CREATE TRIGGER search_{name}_insert AFTER INSERT ON "{table}" BEGIN'
+        f' INSERT INTO "SearchDocuments" (kind, item_id, post_id) VALUES (\'{kind}\', new.id, new.{post_id});'
+        f' INSERT INTO "SearchIndex" (rowid, text) VALUES (last_insert_rowid(), coalesce(new.text, \'\'));'
+        f' END',
+        f'CREATE TRIGGER search_{name}_update AFTER UPDATE OF text ON "{table}" BEGIN'
+        f' UPDATE "SearchIndex" SET text = coalesce(new.text, \'\')'
+        f' WHERE rowid = (SELECT rowid FROM "SearchDocuments" WHERE item_id = new.id);'
+        f' END',
+        f'CREATE TRIGGER search_{name}_delete AFTER DELETE ON "{table}" BEGIN'
+        f' DELETE FROM "SearchIndex" WHERE rowid = (SELECT rowid FROM "SearchDocuments" WHERE item_id = old.id);'
+        f' DELETE FROM "SearchDocuments" WHERE item_id = old.id;'
+        f' END',
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            'CREATE TABLE "SearchDocuments" ('
+            ' rowid INTEGER PRIMARY KEY, kind VARCHAR(7) NOT NULL,'
+            ' item_id VARCHAR(36) NOT NULL UNIQUE, post_id VARCHAR(36) NOT NULL)'
+        )
+        op.execute('CREATE VIRTUAL TABLE "SearchIndex" USING fts5(text, tokenize = \'unicode61\', prefix = \'2 3\')')
+        for table, kind, post_id in SOURCES:
+            op.execute(
+                f'INSERT INTO "SearchDocuments" (kind, item_id, post_id)'
+                f' SELECT \'{kind}\', id, {post_id} FROM "{table}"'
+            )
+            op.execute(
+                f'INSERT INTO "SearchIndex" (rowid, text)'
+                f' SELECT d.rowid, coalesce(t.text, \'\') FROM "SearchDocuments" d'
+                f' JOIN "{table}" t ON t.id = d.item_id WHERE d.kind = \'{kind}\''
+            )
+            for statement in sqlite_triggers(table, kind, post_id):
+                op.execute(statement)
+        return
+
+    # the generated column is filled for existing rows as it is added
+    for table, _, _ in SOURCES:
+        op.execute(
+            f'ALTER TABLE "{table}" ADD COLUMN search_vector tsvector'
+            f' GENERATED ALWAYS AS (to_tsvector(\'simple\', coalesce(text, \'\'))) STORED'
+        )
+        op.create_index(f'ix_{table.lower()}_search_vector', table, ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        for table, _, _ in SOURCES:
+            for action in ('insert', 'update', 'delete'):
+                op.execute(f'DROP TRIGGER IF EXISTS search_{table.lower()}_{action}')
+        op.execute('DROP TABLE "SearchIndex"')
+        op.execute('DROP TABLE "SearchDocuments"')
+        return
+
+    for table, _, _ in SOURCES:
+        op.drop_index(f'ix_{table.lower()}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
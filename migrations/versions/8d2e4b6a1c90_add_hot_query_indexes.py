@@ -0,0 +1,33 @@
+"""add hot query indexes
+
+Revision ID: 8d2e4b6a1c90
+Revises: 3f1a9c2d7b64
+Create Date: 2026-10-18 10:21:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '8d2e4b6a1c90'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c2d7b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_posts_created_at_id', 'Posts', ['created_at', 'id'], unique=False)
+    op.create_index('ix_posts_user_id_created_at_id', 'Posts', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_comments_post_id_created_at_id', 'Comments', ['post_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_likes_post_id', 'Likes', ['post_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_likes_post_id', table_name='Likes')
+    op.drop_index('ix_comments_post_id_created_at_id', table_name='Comments')
+    op.drop_index('ix_posts_user_id_created_at_id', table_name='Posts')
+    op.drop_index('ix_posts_created_at_id', table_name='Posts')
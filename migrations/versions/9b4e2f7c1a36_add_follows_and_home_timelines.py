@@ -0,0 +1,61 @@
+"""add follows and home timelines
+
+Revision ID: 9b4e2f7c1a36
+Revises: 5c8f1d2a9e47
+Create Date: 2026-10-18 16:05:48.730192
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '9b4e2f7c1a36'
+down_revision: Union[str, Sequence[str], None] = '5c8f1d2a9e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('Users', sa.Column('follower_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_users_follower_count', 'Users', ['follower_count'])
+
+    op.create_table(
+        'Follows',
+        sa.Column('follower_id', sa.String(length=36), nullable=False),
+        sa.Column('followee_id', sa.String(length=36), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(['follower_id'], ['Users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['followee_id'], ['Users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('follower_id', 'followee_id'),
+    )
+    op.create_index('ix_follows_followee_id_follower_id', 'Follows', ['followee_id', 'follower_id'])
+
+    op.create_table(
+        'HomeTimelines',
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('post_id', sa.String(length=36), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['Users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['post_id'], ['Posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'created_at', 'post_id'),
+    )
+    op.create_index('ix_hometimelines_post_id', 'HomeTimelines', ['post_id'])
+
+    # nobody follows anyone yet, but each home timeline starts with its owner's own posts
+    op.execute(
+        'INSERT INTO "HomeTimelines" (user_id, created_at, post_id)'
+        ' SELECT user_id, created_at, id FROM "Posts"'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_hometimelines_post_id', table_name='HomeTimelines')
+    op.drop_table('HomeTimelines')
+    op.drop_index('ix_follows_followee_id_follower_id', table_name='Follows')
+    op.drop_table('Follows')
+    op.drop_index('ix_users_follower_count', table_name='Users')
+    op.drop_column('Users', 'follower_count')
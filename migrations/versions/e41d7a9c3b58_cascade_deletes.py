@@ -0,0 +1,57 @@
+"""cascade deletes
+
+Revision ID: e41d7a9c3b58
+Revises: b7c3e9f2a415
+Create Date: 2026-10-18 11:02:14.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e41d7a9c3b58'
+down_revision: Union[str, Sequence[str], None] = 'b7c3e9f2a415'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referred table); names follow the Postgres defaults create_all produced
+FOREIGN_KEYS = [
+    ('Posts', 'user_id', 'Users'),
+    ('Likes', 'user_id', 'Users'),
+    ('Likes', 'post_id', 'Posts'),
+    ('Comments', 'user_id', 'Users'),
+    ('Comments', 'post_id', 'Posts'),
+    ('EmailVerificationTokens', 'user_id', 'Users'),
+]
+
+# SQLite constraints are unnamed; batch mode reflects them under these names so they can be swapped
+SQLITE_NAMING = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+
+def replace_foreign_keys(ondelete) -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot alter constraints, so batch mode rebuilds each table
+        for table in dict.fromkeys(table for table, _, _ in FOREIGN_KEYS):
+            with op.batch_alter_table(table, recreate='always', naming_convention=SQLITE_NAMING) as batch_op:
+                for _, column, referred in (fk for fk in FOREIGN_KEYS if fk[0] == table):
+                    name = f'{table}_{column}_fkey'
+                    batch_op.drop_constraint(name, type_='foreignkey')
+                    batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+        return
+
+    for table, column, referred in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    replace_foreign_keys(None)